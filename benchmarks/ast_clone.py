@@ -0,0 +1,42 @@
+'''
+Compare ast_util.clone with copy.deepcopy on large modules.
+
+    python -m benchmarks.ast_clone [repeat] [module ...]
+
+Modules default to a few large modules of the standard library; each is parsed
+once and copied "repeat" times by each method, the best time is reported.
+'''
+
+import ast
+import copy
+import importlib.util
+import sys
+import time
+
+from pydopast.utils.ast_util import clone
+
+DEFAULT_MODULES = ['typing', 'inspect', 'argparse', 'pydoc']
+
+def best(function, tree, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(tree)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(repeat=5, *modules):
+    print(f'{"module":<10} {"nodes":>8} {"deepcopy":>10} {"clone":>10} {"shared":>10}')
+    for name in modules or DEFAULT_MODULES:
+        with open(importlib.util.find_spec(name).origin, 'rb') as f:
+            tree = ast.parse(f.read())
+        nodes = sum(1 for _ in ast.walk(tree))
+
+        deep = best(copy.deepcopy, tree, repeat)
+        fast = best(clone, tree, repeat)
+        shared = best(lambda tree: clone(tree, share_leaves=True), tree, repeat)
+        print(f'{name:<10} {nodes:>8} {deep * 1e3:8.1f}ms {fast * 1e3:8.1f}ms {shared * 1e3:8.1f}ms'
+              f'  ({deep / fast:.1f}x, {deep / shared:.1f}x)')
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]), *sys.argv[2:])
@@ -0,0 +1,92 @@
+'''
+Compare the memory used by the index of a parsed core module with the former
+layout (plain dict attributes and attr_to_id, eagerly built class indexes).
+
+    python -m benchmarks.memory_layout [functions] [classes] [copies]
+
+The AST itself is parsed once and shared, only the index structures are measured.
+'''
+
+import ast
+import sys
+import tracemalloc
+
+from pydopast.core_module import CoreModuleParser
+
+
+class LegacyModuleAttribute:
+    def __init__(self):
+        self.body = []
+        self.attr_to_id = dict()
+
+class LegacyClassAttribute(LegacyModuleAttribute): pass
+
+class LegacyModuleParser(CoreModuleParser):
+    def parse(self, module_ast):
+        self.module_attrs = LegacyModuleAttribute()
+        self.module_attrs.body = module_ast.body
+        for idx, node in enumerate(module_ast.body):
+            self.index_statement(node, idx)
+        return self.module_attrs
+
+    def visit_ClassDef(self, node, idx=-1):
+        if node.name in self.module_attrs.attr_to_id:
+            self.module_attrs.attr_to_id[node.name] = -1
+        else:
+            self.module_attrs.attr_to_id[node.name] = (idx, LegacyClassParser().parse(node))
+
+class LegacyClassParser(LegacyModuleParser):
+    def parse(self, class_ast):
+        self.module_attrs = LegacyClassAttribute()
+        for idx, node in enumerate(class_ast.body):
+            self.index_statement(node, idx)
+        return self.module_attrs
+
+    def visit_ClassDef(self, node, idx=-1):
+        pass
+
+
+def synthetic_module(functions: int, classes: int) -> str:
+    src = []
+    for i in range(functions):
+        src.append(f'var_{i} = {i}\ndef function_{i}(a, b):\n    return a + b + var_{i}\n')
+    for i in range(classes):
+        src.append(f'class Class_{i}(Base):\n    field = {i}\n')
+        for j in range(5):
+            src.append(f'    def method_{j}(self, x):\n        return x + self.field\n')
+    return ''.join(src)
+
+def measure(parse, trees) -> int:
+    # One-time allocations (e.g. the shared positions) are not part of the layout
+    parse(trees[0])
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = [parse(tree) for tree in trees]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del results
+    return size
+
+def main(functions=5000, classes=1000, copies=5):
+    src = synthetic_module(functions, classes)
+    trees = [ast.parse(src) for _ in range(copies)]
+
+    def parse_new(tree):
+        module_attrs = CoreModuleParser().parse(tree)
+        for value in module_attrs.attr_to_id.values():
+            if isinstance(value, tuple):
+                value[1].attr_to_id
+        return module_attrs
+
+    legacy = measure(lambda tree: LegacyModuleParser().parse(tree), trees)
+    new = measure(parse_new, trees)
+    lazy = measure(lambda tree: CoreModuleParser().parse(tree), trees)
+
+    print(f'{copies} modules, {functions * 2} top-level names and {classes} classes each')
+    print(f'legacy layout:          {legacy / 1024:10.1f} KiB')
+    print(f'compact layout:         {new / 1024:10.1f} KiB ({new / legacy:.0%})')
+    print(f'compact, classes lazy:  {lazy / 1024:10.1f} KiB ({lazy / legacy:.0%})')
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -1 +1,5 @@
-from .parsers import ModuleAttribute, CoreModuleParser, ClassAttribute, ClassParser
\ No newline at end of file
+from .parsers import ModuleAttribute, CoreModuleParser, ClassAttribute, ClassParser, Binding, Occurrence
+from .cache import ParseCache
+from .incremental import reparse
+from .package import parse_package, find_modules, PackageParseError
+from .headers import parse_header_only
@@ -0,0 +1,307 @@
+import ast
+
+from .index import MAX_FORK_DEPTH
+
+_MISSING = object()
+_DELETED = object()
+
+# Anchor of the statements inserted before the first statement of the root
+_HEAD = -1
+
+# Structural changes tolerated before a Body is compacted (and at least one per statement)
+_COMPACT_THRESHOLD = 64
+
+class _Root:
+    '''Statements in order, shared by every Body forked from it'''
+
+    __slots__ = ('order', 'statements', '_index')
+
+    def __init__(self, order: range | tuple[int, ...], statements: list | tuple | dict[int, ast.stmt]):
+        # After parsing, handle i is the i-th statement: order is a range and statements a sequence
+        self.order = order
+        self.statements = statements
+        self._index: dict[int, int] | None = None
+
+    def get(self, handle: int):
+        if not isinstance(self.statements, dict):
+            return self.statements[handle] if 0 <= handle < len(self.statements) else _MISSING
+        return self.statements.get(handle, _MISSING)
+
+    def predecessor(self, handle: int) -> int:
+        if isinstance(self.order, range):
+            return handle - 1
+        if self._index is None:
+            self._index = {h: i for i, h in enumerate(self.order)}
+        i = self._index[handle]
+        return self.order[i - 1] if i else _HEAD
+
+    def last(self) -> int:
+        return self.order[-1] if self.order else _HEAD
+
+class _Layer:
+    '''Frozen changes of a Body, shared by the bodies forked from it'''
+
+    __slots__ = ('parent', 'changes', 'after', 'anchors', 'depth')
+
+    def __init__(self, parent: '_Layer | _Root', changes: dict, after: dict, anchors: dict):
+        self.parent = parent
+        self.changes = changes
+        self.after = after
+        self.anchors = anchors
+        self.depth = parent.depth + 1 if isinstance(parent, _Layer) else 1
+
+class Body:
+    '''
+    Ordered statements of a ModuleAttribute, addressed by stable handles.
+
+    Handles are the positions stored in attr_to_id: after parsing, handle i is
+    the i-th statement, and inserting or deleting statements never changes the
+    handle of the others. Iterating yields the live statements in order.
+
+    The parsed statements are kept in a root shared by every fork. Each Body
+    only records its replaced or deleted handles, and the statements inserted
+    after each root statement (the "anchor" of the inserted handle), on top of
+    the frozen changes of the bodies it was forked from. The changes are folded
+    into a new root once they outnumber the statements.
+    '''
+
+    __slots__ = ('_base', '_changes', '_after', '_anchors', '_length', '_next', '_structural', '_shared', '_modified')
+
+    def __init__(self, statements=()):
+        # A parsed body (list) is kept without copying it: it must not be modified afterwards
+        if not isinstance(statements, (list, tuple)):
+            statements = tuple(statements)
+        self._base: _Layer | _Root = _Root(range(len(statements)), statements)
+        self._changes: dict[int, object] | None = None
+        self._after: dict[int, list[int]] | None = None
+        self._anchors: dict[int, int] | None = None
+        self._length = len(statements)
+        self._next = len(statements)
+        self._structural = 0
+        self._shared = False
+        self._modified = False
+
+    @property
+    def is_shared(self) -> bool:
+        '''Whether the statements are shared with a fork'''
+
+        return self._shared
+
+    @property
+    def is_modified(self) -> bool:
+        '''Whether statements were replaced, inserted or deleted since the Body was created'''
+
+        return self._modified
+
+    def _layers(self) -> tuple[list[_Layer], _Root]:
+        layers = []
+        base = self._base
+        while isinstance(base, _Layer):
+            layers.append(base)
+            base = base.parent
+        return layers, base
+
+    def _lookup(self, handle: int):
+        if self._changes is not None and handle in self._changes:
+            return self._changes[handle]
+        base = self._base
+        while isinstance(base, _Layer):
+            if handle in base.changes:
+                return base.changes[handle]
+            base = base.parent
+        return base.get(handle)
+
+    def _merged(self) -> tuple[_Root, dict, dict]:
+        layers, root = self._layers()
+        changes, after = dict(), dict()
+        for layer in reversed(layers):
+            changes.update(layer.changes)
+            after.update(layer.after)
+        changes.update(self._changes or {})
+        after.update(self._after or {})
+        return root, changes, after
+
+    def __getitem__(self, handle: int) -> ast.stmt:
+        statement = self._lookup(handle)
+        if statement is _MISSING or statement is _DELETED:
+            raise KeyError(handle)
+        return statement
+
+    def __setitem__(self, handle: int, statement: ast.stmt):
+        self[handle]
+        if self._changes is None:
+            self._changes = dict()
+        self._changes[handle] = statement
+        self._modified = True
+
+    def __delitem__(self, handle: int):
+        self[handle]
+        if self._changes is None:
+            self._changes = dict()
+        self._changes[handle] = _DELETED
+        self._modified = True
+        self._length -= 1
+        self._changed()
+
+    def __contains__(self, handle) -> bool:
+        statement = self._lookup(handle)
+        return statement is not _MISSING and statement is not _DELETED
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        if self._changes is None and self._after is None and isinstance(self._base, _Root) \
+                and not isinstance(self._base.statements, dict):
+            return iter(self._base.statements)
+        return iter([statement for _, statement in self.items()])
+
+    def handles(self) -> list[int]:
+        '''Handles of the live statements, in order'''
+
+        return [handle for handle, _ in self.items()]
+
+    def items(self) -> list[tuple[int, ast.stmt]]:
+        root, changes, after = self._merged()
+        if after:
+            order = list(after.get(_HEAD, ()))
+            for handle in root.order:
+                order.append(handle)
+                order.extend(after.get(handle, ()))
+        else:
+            order = root.order
+
+        items = []
+        for handle in order:
+            statement = changes.get(handle, _MISSING)
+            if statement is _MISSING:
+                statement = root.get(handle)
+            if statement is not _DELETED:
+                items.append((handle, statement))
+        return items
+
+    def append(self, statement: ast.stmt) -> int:
+        _, root = self._layers()
+        anchor = root.last()
+        return self._insert(anchor, len(self._anchor_list(anchor)), statement)
+
+    def insert_before(self, handle: int, statement: ast.stmt) -> int:
+        self[handle]
+        _, root = self._layers()
+        if root.get(handle) is not _MISSING:
+            anchor = root.predecessor(handle)
+            return self._insert(anchor, len(self._anchor_list(anchor)), statement)
+
+        anchor = self._anchor(handle)
+        return self._insert(anchor, self._anchor_list(anchor).index(handle), statement)
+
+    def insert_after(self, handle: int, statement: ast.stmt) -> int:
+        self[handle]
+        _, root = self._layers()
+        if root.get(handle) is not _MISSING:
+            return self._insert(handle, 0, statement)
+
+        anchor = self._anchor(handle)
+        return self._insert(anchor, self._anchor_list(anchor).index(handle) + 1, statement)
+
+    def _anchor(self, handle: int) -> int:
+        if self._anchors is not None and handle in self._anchors:
+            return self._anchors[handle]
+        base = self._base
+        while isinstance(base, _Layer):
+            if handle in base.anchors:
+                return base.anchors[handle]
+            base = base.parent
+        raise KeyError(handle)
+
+    def _anchor_list(self, anchor: int) -> list[int]:
+        if self._after is not None and anchor in self._after:
+            return self._after[anchor]
+        base = self._base
+        while isinstance(base, _Layer):
+            if anchor in base.after:
+                return base.after[anchor]
+            base = base.parent
+        return []
+
+    def _insert(self, anchor: int, index: int, statement: ast.stmt) -> int:
+        handle = self._next
+        self._next += 1
+
+        if self._after is None:
+            self._after = dict()
+        if anchor not in self._after:
+            # Lists of frozen layers are shared, copy before inserting
+            self._after[anchor] = list(self._anchor_list(anchor))
+        self._after[anchor].insert(index, handle)
+
+        if self._anchors is None:
+            self._anchors = dict()
+        self._anchors[handle] = anchor
+        if self._changes is None:
+            self._changes = dict()
+        self._changes[handle] = statement
+        self._modified = True
+
+        self._length += 1
+        self._changed()
+        return handle
+
+    def _changed(self):
+        self._structural += 1
+        _, root = self._layers()
+        if self._structural > max(_COMPACT_THRESHOLD, len(root.order)):
+            self._compact()
+
+    def _compact(self):
+        items = self.items()
+        handles = tuple(handle for handle, _ in items)
+        if handles == tuple(range(len(handles))):
+            root = _Root(range(len(handles)), tuple(statement for _, statement in items))
+        else:
+            root = _Root(handles, dict(items))
+
+        self._base = root
+        self._changes = self._after = self._anchors = None
+        self._structural = 0
+
+    def fork(self) -> 'Body':
+        '''Body with the same statements, sharing them with this one until either is modified'''
+
+        if self._changes or self._after:
+            # Freeze the changes made so far, both bodies continue above them
+            self._base = _Layer(self._base, self._changes or {}, self._after or {}, self._anchors or {})
+            self._changes = self._after = self._anchors = None
+            if self._base.depth > MAX_FORK_DEPTH:
+                self._compact()
+
+        forked = Body.__new__(Body)
+        forked._base = self._base
+        forked._changes = forked._after = forked._anchors = None
+        forked._length = self._length
+        forked._next = self._next
+        forked._structural = self._structural
+        forked._shared = self._shared = True
+        forked._modified = self._modified
+        return forked
+
+    def __eq__(self, value):
+        if isinstance(value, (Body, list, tuple)):
+            return len(self) == len(value) and all(a is b or a == b for a, b in zip(self, value))
+        return NotImplemented
+
+    def __repr__(self):
+        return f'Body({dict(self.items())!r})'
+
+    def __reduce__(self):
+        items = self.items()
+        return (_restore, (tuple(h for h, _ in items), tuple(s for _, s in items), self._next, self._modified))
+
+def _restore(handles: tuple[int, ...], statements: tuple, next_handle: int, modified: bool = True) -> Body:
+    body = Body(statements)
+    if handles != tuple(range(len(handles))):
+        body._base = _Root(handles, dict(zip(handles, statements)))
+    body._next = next_handle
+    # Bodies pickled without the flag are taken as modified
+    body._modified = modified
+    return body
@@ -0,0 +1,80 @@
+import ast
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+from .parsers import ModuleAttribute, CoreModuleParser
+
+# Bump whenever the pickled layout of ModuleAttribute/ClassAttribute changes
+CACHE_VERSION = 5
+
+class ParseCache:
+    '''
+    Persistent on-disk cache of CoreModuleParser results.
+
+    Entries are keyed by the hash of the core source, the interpreter cache tag
+    (the AST layout differs between Python versions) and CACHE_VERSION.
+    A hit skips both ast.parse and the indexing visitor.
+    '''
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: str | bytes) -> str:
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+        digest = hashlib.sha256()
+        digest.update(f'{sys.implementation.cache_tag}:{CACHE_VERSION}:'.encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.pickle')
+
+    def load(self, key: str) -> ModuleAttribute | None:
+        try:
+            with open(self.path(key), 'rb') as f:
+                module_attrs = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or stale entries are treated as a miss and rebuilt
+            return None
+
+        if not isinstance(module_attrs, ModuleAttribute):
+            return None
+        return module_attrs
+
+    def store(self, key: str, module_attrs: ModuleAttribute):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(module_attrs, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def parse(self, source: str | bytes, filename: str = '<unknown>') -> ModuleAttribute:
+        key = self.key(source)
+        module_attrs = self.load(key)
+        if module_attrs is not None:
+            return module_attrs
+
+        module_attrs = CoreModuleParser().parse(ast.parse(source, filename))
+        self.store(key, module_attrs)
+        return module_attrs
+
+    def parse_file(self, filename: str) -> ModuleAttribute:
+        with open(filename, 'rb') as f:
+            source = f.read()
+        return self.parse(source, filename)
+
+    def clear(self):
+        for entry in os.listdir(self.directory):
+            if entry.endswith('.pickle'):
+                os.remove(os.path.join(self.directory, entry))
@@ -0,0 +1,176 @@
+import ast
+import io
+import re
+
+from ..utils.ast_util import DeferredBody
+from .parsers import ModuleAttribute, CoreModuleParser
+
+_STRINGS_AND_COMMENTS = re.compile(
+    r'''[rRbBuUfFtT]{0,2}(?:"""(?:\\[\s\S]|[^\\])*?"""|\'\'\'(?:\\[\s\S]|[^\\])*?\'\'\''''
+    r'''|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')|#[^\n]*'''
+)
+_NOT_NEWLINE = re.compile(r'[^\n]')
+_DEFINITION = re.compile(r'(?:@|def[ \t(]|async[ \t]+def[ \t]|class[ \t(:])')
+_CONTINUATION = re.compile(r'(?:elif|else|except|finally)\b')
+
+def parse_header_only(source: str) -> ModuleAttribute:
+    '''
+    Parse a core module without parsing the body of its functions and methods.
+
+    Function bodies are found from the indentation of the source, blanked out, and
+    the remaining skeleton is parsed once. Each function then gets a DeferredBody
+    holding the source range of its body, parsed the first time it is used.
+    The result is indexed like CoreModuleParser.parse and, once materialized, is
+    identical to parsing the whole source. Layouts the scanner cannot decide on
+    (e.g. f-strings spanning lines) fall back to a full parse.
+    '''
+
+    source = source.replace('\r\n', '\n').replace('\r', '\n')
+    module_ast = _HeaderParser(source).parse()
+    if module_ast is None:
+        module_ast = ast.parse(source)
+    return CoreModuleParser().parse(module_ast)
+
+def _mask(match: re.Match) -> str:
+    text = match.group()
+    # Strings keep a placeholder so that a line starting with one is still seen as code
+    placeholder = ' ' if text.startswith('#') else '_'
+    if '\n' in text:
+        return placeholder + _NOT_NEWLINE.sub(' ', text[1:])
+    return placeholder + ' ' * (len(text) - 1)
+
+class _HeaderParser:
+    def __init__(self, source: str):
+        self.source = source
+        self.lines = io.StringIO(source).readlines()
+        self.offsets = [0]
+        for line in self.lines:
+            self.offsets.append(self.offsets[-1] + len(line))
+
+        # Strings and comments blanked, so that brackets and colons can be trusted
+        masked = _STRINGS_AND_COMMENTS.sub(_mask, source)
+        # A quote left means a string the regex could not delimit (e.g. a multi-line f-string)
+        self.is_supported = '"' not in masked and "'" not in masked
+        self.masked = masked.split('\n')
+
+        # Whether a statement may start on each line (no open bracket or line continuation)
+        self.at_top = []
+        depth = 0
+        continued = False
+        for line in self.masked:
+            self.at_top.append(depth == 0 and not continued)
+            depth += line.count('(') + line.count('[') + line.count('{') \
+                - line.count(')') - line.count(']') - line.count('}')
+            continued = line.endswith('\\')
+        self.at_top.append(True)
+
+        # First line of each deferred body -> line after its end
+        self.deferred: dict[int, int] = dict()
+
+    def parse(self) -> ast.Module | None:
+        if not self.is_supported:
+            return None
+
+        self.scan(0, len(self.lines), '')
+        skeleton = list(self.lines)
+        for body_start, end in self.deferred.items():
+            indent = self.indentation(self.first_code_line(body_start, end))
+            skeleton[body_start] = indent + 'pass\n'
+            for i in range(body_start + 1, end):
+                skeleton[i] = '\n'
+
+        try:
+            module_ast = ast.parse(''.join(skeleton))
+        except SyntaxError:
+            return None
+
+        restored = self.restore(module_ast.body)
+        if restored != len(self.deferred):
+            return None
+        return module_ast
+
+    def scan(self, first: int, last: int, indent: str):
+        '''Find the functions defined in lines [first, last) at the given indentation'''
+
+        starts = []
+        for i in range(first, last):
+            line = self.masked[i]
+            if self.at_top[i] and line.startswith(indent) and len(line) > len(indent) \
+                    and line[len(indent)] not in ' \t\f' and not _CONTINUATION.match(line, len(indent)):
+                starts.append(i)
+        starts.append(last)
+
+        for k in range(len(starts) - 1):
+            start, end = starts[k], starts[k + 1]
+            line = self.masked[start]
+            if line.startswith('@', len(indent)) or not _DEFINITION.match(line, len(indent)):
+                continue
+
+            header_end = start
+            while header_end < end and not (
+                self.at_top[header_end + 1] and self.masked[header_end].rstrip().endswith(':')
+            ):
+                header_end += 1
+
+            body_start = header_end + 1
+            first_code = self.first_code_line(body_start, end)
+            if first_code is None or len(self.indentation(first_code)) <= len(indent):
+                # "def f(): return 1" or not a definition after all
+                continue
+
+            if line.startswith('class', len(indent)):
+                self.scan(body_start, end, self.indentation(first_code))
+            else:
+                self.deferred[body_start] = end
+
+    def restore(self, body: list[ast.stmt]) -> int:
+        '''Replace the placeholder bodies by DeferredBody, returns how many were replaced'''
+
+        restored = 0
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and len(node.body) == 1 \
+                    and isinstance(node.body[0], ast.Pass) and node.body[0].lineno - 1 in self.deferred:
+                body_start = node.body[0].lineno - 1
+                end = self.deferred[body_start]
+                node.body = DeferredBody(
+                    self.source, self.offsets[body_start], self.offsets[end], body_start + 1, [node]
+                )
+                self.set_end(node, body_start, end)
+                restored += 1
+            elif isinstance(node, ast.ClassDef):
+                restored += self.restore(node.body)
+                last_member = node.body[-1]
+                node.end_lineno = last_member.end_lineno
+                node.end_col_offset = last_member.end_col_offset
+                tail = last_member
+                while isinstance(tail, ast.ClassDef):
+                    tail = tail.body[-1]
+                if isinstance(getattr(tail, 'body', None), DeferredBody):
+                    # The class ends where its last method ends
+                    tail.body.owners.append(node)
+        return restored
+
+    def set_end(self, node: ast.stmt, body_start: int, end: int):
+        '''Best-effort end position, made exact when the body is materialized'''
+
+        last = end - 1
+        while last >= body_start and not self.is_code(self.lines[last]):
+            last -= 1
+        code = self.masked[last].rstrip() or self.lines[last].rstrip()
+        node.end_lineno = last + 1
+        node.end_col_offset = len(self.lines[last][:len(code)].encode('utf-8'))
+
+    def first_code_line(self, start: int, end: int) -> int | None:
+        for i in range(start, end):
+            if self.is_code(self.lines[i]):
+                return i
+        return None
+
+    def indentation(self, line_no: int) -> str:
+        line = self.lines[line_no]
+        return line[:len(line) - len(line.lstrip(' \t\f'))]
+
+    @staticmethod
+    def is_code(line: str) -> bool:
+        stripped = line.lstrip()
+        return bool(stripped) and not stripped.startswith('#')
@@ -0,0 +1,184 @@
+import ast
+
+from ..utils.ast_util import shift_lines
+from .parsers import ModuleAttribute, CoreModuleParser
+from .body import Body
+
+def reparse(previous: ModuleAttribute, old_source: str, new_source: str) -> ModuleAttribute:
+    '''
+    Update "previous", the result of parsing "old_source", so that it matches "new_source".
+
+    Only the top-level statements overlapping the edited lines are parsed and indexed again.
+    Statements before the edit are kept as is, statements after it are kept with their
+    line numbers and attr_to_id positions shifted, and their ClassAttribute are reused.
+    Shifting still visits every node after the edit (but not the deferred function bodies
+    of parse_header_only), so edits near the end of a module are the cheapest.
+
+    "previous" is patched in place and returned. When it cannot be patched (an operation
+    replaced, inserted or deleted statements of its body, its body is shared with a fork,
+    or the edited lines do not parse on their own) the whole new source is parsed again instead.
+    '''
+
+    old_lines = old_source.splitlines(keepends=True)
+    new_lines = new_source.splitlines(keepends=True)
+
+    body = list(previous.body)
+    spans = _statement_spans(body, len(old_lines))
+    if spans is None or previous.body.is_modified or previous.body.is_shared:
+        # Statements changed by an operation do not match the source, and statements
+        # shared with a fork cannot be shifted in place
+        return _replace(previous, CoreModuleParser().parse(ast.parse(new_source)))
+
+    limit = min(len(old_lines), len(new_lines))
+    prefix = 0
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    if prefix == len(old_lines) == len(new_lines):
+        return previous
+
+    suffix = 0
+    while suffix < limit - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+
+    n = len(body)
+    head = 0
+    while head < n and spans[head][1] <= prefix:
+        head += 1
+    # Statements sharing a line with an edited one (a = 1; b = 2) are parsed again as well
+    while 0 < head < n and spans[head][0] <= spans[head - 1][1]:
+        head -= 1
+
+    first_suffix_line = len(old_lines) - suffix + 1
+    tail = 0
+    while tail < n - head and spans[n - 1 - tail][0] >= first_suffix_line:
+        tail += 1
+    while 0 < tail < n - head and spans[n - tail][0] <= spans[n - 1 - tail][1]:
+        tail -= 1
+
+    line_shift = len(new_lines) - len(old_lines)
+    start_line = spans[head - 1][1] + 1 if head else 1
+    end_line = spans[n - tail][0] - 1 + line_shift if tail else len(new_lines)
+
+    try:
+        added = ast.parse(''.join(new_lines[start_line - 1:end_line])).body
+    except SyntaxError:
+        return _replace(previous, CoreModuleParser().parse(ast.parse(new_source)))
+
+    for node in added:
+        if isinstance(node, ast.ImportFrom) and node.module == '__future__':
+            return _replace(previous, CoreModuleParser().parse(ast.parse(new_source)))
+        shift_lines(node, start_line - 1)
+    if line_shift:
+        for node in body[n - tail:]:
+            shift_lines(node, line_shift)
+
+    removed = body[head:n - tail]
+    body[head:n - tail] = added
+    previous.body = Body(body)
+
+    if not _patch_index(previous, removed, added, head, n - tail):
+        _reindex(previous, head, n - tail, len(added) - len(removed))
+    return previous
+
+def _statement_spans(body: list, line_count: int) -> list[tuple[int, int]] | None:
+    spans = []
+    for node in body:
+        if not isinstance(node, ast.stmt) or getattr(node, 'end_lineno', None) is None:
+            return None
+
+        start = node.lineno
+        for dec in getattr(node, 'decorator_list', ()):
+            start = min(start, dec.lineno)
+        spans.append((start, node.end_lineno))
+
+    if spans and spans[-1][1] > line_count:
+        return None
+    return spans
+
+def _bindings(node: ast.stmt, idx: int) -> dict:
+    parser = CoreModuleParser()
+    parser.module_attrs = ModuleAttribute()
+    parser.index_statement(node, idx)
+    return parser.module_attrs.attr_to_id
+
+def _shift(value, shift: int):
+    if isinstance(value, tuple):
+        return (value[0] + shift, value[1])
+    return value + shift
+
+def _position(value) -> int:
+    return value[0] if isinstance(value, tuple) else value
+
+def _patch_index(module_attrs: ModuleAttribute, removed: list, added: list, head: int, old_suffix_start: int) -> bool:
+    '''Returns False if the bindings of a changed name cannot be derived from attr_to_id alone'''
+
+    removed_count = dict()
+    for offset, node in enumerate(removed):
+        for name in _bindings(node, head + offset):
+            removed_count[name] = removed_count.get(name, 0) + 1
+
+    added_values = dict()
+    for offset, node in enumerate(added):
+        for name, value in _bindings(node, head + offset).items():
+            added_values.setdefault(name, []).append(value)
+
+    attr_to_id = module_attrs.attr_to_id
+    kept_count = dict()
+    for name in removed_count.keys() | added_values.keys():
+        if name not in attr_to_id:
+            old_count = 0
+        elif attr_to_id[name] == -1:
+            # The occurrences of the name have to be recorded again
+            return False
+        else:
+            old_count = 1
+
+        kept_count[name] = old_count - removed_count.get(name, 0)
+        values = added_values.get(name, [])
+        if kept_count[name] < 0 or kept_count[name] + len(values) > 1 or -1 in values:
+            return False
+
+    shift = len(added) - len(removed)
+    if shift:
+        for name, value in list(attr_to_id.items()):
+            if value == -1:
+                attr_to_id.set_occurrences(name, tuple(
+                    occurrence._replace(position=occurrence.position + shift)
+                    if occurrence.position >= old_suffix_start else occurrence
+                    for occurrence in attr_to_id.occurrences(name)
+                ))
+            elif _position(value) >= old_suffix_start:
+                attr_to_id[name] = _shift(value, shift)
+
+    for name, kept in kept_count.items():
+        values = added_values.get(name, [])
+        if not kept and not values:
+            del attr_to_id[name]
+        elif not kept:
+            attr_to_id[name] = values[0]
+    return True
+
+def _reindex(module_attrs: ModuleAttribute, head: int, old_suffix_start: int, shift: int):
+    old_classes = dict()
+    for value in module_attrs.attr_to_id.values():
+        if isinstance(value, tuple) and 0 <= value[0] < head:
+            old_classes[id(module_attrs.body[value[0]])] = value[1]
+        elif isinstance(value, tuple) and value[0] >= old_suffix_start:
+            old_classes[id(module_attrs.body[value[0] + shift])] = value[1]
+
+    parser = CoreModuleParser()
+    parser.module_attrs = ModuleAttribute()
+    parser.module_attrs.body = module_attrs.body
+    for idx, node in enumerate(module_attrs.body):
+        parser.index_statement(node, idx)
+
+    attr_to_id = parser.module_attrs.attr_to_id
+    for name, value in attr_to_id.items():
+        if isinstance(value, tuple) and value[0] >= 0 and id(module_attrs.body[value[0]]) in old_classes:
+            attr_to_id[name] = (value[0], old_classes[id(module_attrs.body[value[0]])])
+    module_attrs.attr_to_id = attr_to_id
+
+def _replace(module_attrs: ModuleAttribute, parsed: ModuleAttribute) -> ModuleAttribute:
+    module_attrs.body = parsed.body
+    module_attrs.attr_to_id = parsed.attr_to_id
+    return module_attrs
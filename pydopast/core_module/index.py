@@ -0,0 +1,202 @@
+import sys
+
+from collections.abc import MutableMapping
+
+# Forks stacked over a shared index before it is flattened again
+MAX_FORK_DEPTH = 16
+
+_MISSING = object()
+
+# Positions below this bound share their int objects between every AttrIndex:
+# each parsed module would otherwise allocate one int per top-level name
+MAX_SHARED_POSITION = 1 << 15
+_shared_positions: list[int] = []
+
+def _share_position(position: int) -> int:
+    if not 0 <= position < MAX_SHARED_POSITION:
+        return position
+    if position >= len(_shared_positions):
+        _shared_positions.extend(range(len(_shared_positions), min(2 * position + 256, MAX_SHARED_POSITION)))
+    return _shared_positions[position]
+
+class AttrIndex(MutableMapping):
+    '''
+    Compact replacement for the attr_to_id dict of ModuleAttribute.
+
+    Names are interned, positions share their int objects with the other
+    indexes (up to MAX_SHARED_POSITION), and the ClassAttribute of class
+    entries are kept in a sparse side table instead of (position,
+    ClassAttribute) tuples. Lookups return the same values as the former
+    dict: a body position, -1 for names that cannot be modified, or a
+    (position, ClassAttribute) tuple.
+
+    fork() returns an index sharing its entries: both indexes then only record
+    their own changes over a frozen "_parent" (None marks a deleted name), and
+    ClassAttribute read through a shared entry are forked on first access.
+
+    Names bound more than once or by something else than a whole top-level
+    statement keep their Occurrence tuple in place of a position; they read as -1.
+    '''
+
+    __slots__ = ('_positions', '_classes', '_parent')
+
+    def __init__(self, items=()):
+        self._positions: dict[str, int | None] = dict()
+        # Allocated on first use, most class bodies hold no inner class
+        self._classes: dict[str, object] | None = None
+        self._parent: AttrIndex | None = None
+        for name, value in dict(items).items():
+            self[name] = value
+
+    def _find(self, name: str) -> 'AttrIndex | None':
+        '''Index of the chain holding the current entry of "name"'''
+
+        index = self
+        while index is not None:
+            position = index._positions.get(name, _MISSING)
+            if position is not _MISSING:
+                return index if position is not None else None
+            index = index._parent
+        return None
+
+    def __getitem__(self, name: str):
+        owner = self if self._parent is None else self._find(name)
+        if owner is None:
+            raise KeyError(name)
+        position = owner._positions[name]
+        if type(position) is tuple:
+            return -1
+        if owner._classes is None or name not in owner._classes:
+            return position
+
+        class_attr = owner._classes[name]
+        if owner is not self:
+            # Shared with other forks, copied before anyone can modify it
+            class_attr = class_attr.fork()
+            self._set(name, position, class_attr)
+        return (position, class_attr)
+
+    def __setitem__(self, name: str, value):
+        if isinstance(value, tuple):
+            self._set(name, *value)
+        else:
+            self._set(name, value, None)
+
+    def _set(self, name: str, position: int, class_attr):
+        if name not in self._positions:
+            name = sys.intern(name)
+        self._positions[name] = _share_position(position)
+
+        if class_attr is not None:
+            if self._classes is None:
+                self._classes = dict()
+            self._classes[name] = class_attr
+        elif self._classes is not None:
+            self._classes.pop(name, None)
+
+    def occurrences(self, name: str) -> tuple:
+        '''Occurrences recorded for "name", empty if it only has a position'''
+
+        owner = self if self._parent is None else self._find(name)
+        if owner is None:
+            raise KeyError(name)
+        position = owner._positions[name]
+        return position if type(position) is tuple else ()
+
+    def set_occurrences(self, name: str, occurrences: tuple):
+        if name not in self._positions:
+            name = sys.intern(name)
+        self._positions[name] = tuple(occurrences)
+        if self._classes is not None:
+            self._classes.pop(name, None)
+
+    def __delitem__(self, name: str):
+        if self._parent is None:
+            del self._positions[name]
+        elif self._find(name) is None:
+            raise KeyError(name)
+        else:
+            self._positions[name] = None
+
+        if self._classes is not None:
+            self._classes.pop(name, None)
+
+    def __contains__(self, name) -> bool:
+        if self._parent is None:
+            return name in self._positions
+        return self._find(name) is not None
+
+    def __iter__(self):
+        if self._parent is None:
+            return iter(self._positions)
+        return iter(self._live_positions())
+
+    def __len__(self) -> int:
+        if self._parent is None:
+            return len(self._positions)
+        return len(self._live_positions())
+
+    def _chain(self) -> list['AttrIndex']:
+        chain = []
+        index = self
+        while index is not None:
+            chain.append(index)
+            index = index._parent
+        return chain
+
+    def _live_positions(self) -> dict[str, int]:
+        positions = dict()
+        for index in reversed(self._chain()):
+            for name, position in index._positions.items():
+                if position is None:
+                    positions.pop(name, None)
+                else:
+                    positions[name] = position
+        return positions
+
+    def fork(self) -> 'AttrIndex':
+        '''Index with the same entries, sharing them with this one until either is modified'''
+
+        if self._positions or self._classes:
+            # Freeze the changes made so far, both indexes continue above them
+            frozen = AttrIndex()
+            frozen._positions, frozen._classes, frozen._parent = self._positions, self._classes, self._parent
+            if len(frozen._chain()) > MAX_FORK_DEPTH:
+                frozen = frozen._flatten()
+            self._positions, self._classes, self._parent = dict(), None, frozen
+
+        forked = AttrIndex()
+        forked._parent = self._parent
+        return forked
+
+    def _flatten(self) -> 'AttrIndex':
+        flat = AttrIndex()
+        flat._positions = self._live_positions()
+        for name in flat._positions:
+            owner = self._find(name)
+            if owner._classes is not None and name in owner._classes:
+                if flat._classes is None:
+                    flat._classes = dict()
+                flat._classes[name] = owner._classes[name]
+        return flat
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __getstate__(self):
+        positions = self._live_positions()
+        classes = dict()
+        for name in positions:
+            value = self[name]
+            if isinstance(value, tuple):
+                classes[name] = value[1]
+        return (positions, classes)
+
+    def __setstate__(self, state):
+        positions, classes = state
+        self.__init__()
+        for name, position in positions.items():
+            if type(position) is tuple:
+                self.set_occurrences(name, position)
+            else:
+                self._set(name, position, classes.get(name))
@@ -0,0 +1,89 @@
+import ast
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .parsers import ModuleAttribute, CoreModuleParser
+from .cache import ParseCache
+
+class PackageParseError(Exception):
+    '''Raised by parse_package when some modules fail; "modules" holds the ones that were parsed'''
+
+    def __init__(self, errors: dict[str, Exception], modules: dict[str, ModuleAttribute]):
+        self.errors = errors
+        self.modules = modules
+        details = '\n'.join(f'  {name}: {error!r}' for name, error in errors.items())
+        super().__init__(f'Failed to parse {len(errors)} core module(s):\n{details}')
+
+def find_modules(directory: str) -> dict[str, str]:
+    '''
+    Map dotted module names to the .py files under "directory", sorted by name.
+
+    If "directory" is a package (has an __init__.py), names start with its own name.
+    '''
+
+    directory = os.path.abspath(directory)
+    root = directory
+    if os.path.isfile(os.path.join(directory, '__init__.py')):
+        root = os.path.dirname(directory)
+
+    modules = dict()
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != '__pycache__']
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(dirpath, filename)
+            parts = os.path.relpath(path, root)[:-len('.py')].split(os.sep)
+            if parts[-1] == '__init__' and len(parts) > 1:
+                parts.pop()
+            modules['.'.join(parts)] = path
+
+    return dict(sorted(modules.items()))
+
+def parse_package(directory: str, max_workers: int | None = None,
+                  cache_dir: str | None = None) -> dict[str, ModuleAttribute]:
+    '''
+    Parse and index every core module under "directory" in a process pool.
+
+    Returns a dict from module name to ModuleAttribute, ordered by module name.
+    Files that fail to read or parse are collected and reported together through
+    PackageParseError once every module has been processed.
+    max_workers=1 parses in the current process.
+    '''
+
+    modules = find_modules(directory)
+    names = list(modules.keys())
+    paths = list(modules.values())
+    cache_dirs = [cache_dir] * len(paths)
+
+    if max_workers == 1 or len(paths) <= 1:
+        results = list(map(_parse_file, paths, cache_dirs))
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_parse_file, paths, cache_dirs, chunksize=chunksize))
+
+    parsed = dict()
+    errors = dict()
+    for name, (module_attrs, error) in zip(names, results):
+        if error is not None:
+            errors[name] = error
+        else:
+            parsed[name] = module_attrs
+
+    if errors:
+        raise PackageParseError(errors, parsed)
+    return parsed
+
+def _parse_file(path: str, cache_dir: str | None) -> tuple[ModuleAttribute | None, Exception | None]:
+    try:
+        if cache_dir is not None:
+            return ParseCache(cache_dir).parse_file(path), None
+
+        with open(path, 'rb') as f:
+            source = f.read()
+        return CoreModuleParser().parse(ast.parse(source, path)), None
+    except Exception as e:
+        return None, e
@@ -1,28 +1,36 @@
 import enum
 import ast
 
-from dataclasses import dataclass
+from typing import NamedTuple
 from ..utils import ast_util
+from .index import AttrIndex
+from .body import Body
 
 class DeltaException(Exception):
     pass
 
-class Target(enum.Enum):
-    VARIABLE: 1
-    CLASS: 2
-    FUNCTION: 3
+class Binding(enum.Enum):
+    ASSIGN = 'assign'       # "name = ..." or "name: T = ..."
+    FUNCTION = 'function'
+    CLASS = 'class'
+    IMPORT = 'import'
+    DELETE = 'delete'
+    TARGET = 'target'       # any other store: unpacking, for/with targets, augmented assignment, ...
 
-@dataclass
-class LazyDeltaOperation:
-    filename: str
-    firstlineno: int
-    type: Target
+class Occurrence(NamedTuple):
+    '''A binding of a name by the statement at "position" of the body'''
+
+    position: int
+    kind: Binding
+    # False when the binding happens inside a compound statement (if, for, try, ...)
+    top_level: bool
 
 class ModuleAttribute:
+    __slots__ = ('body', 'attr_to_id', '_savepoints')
 
     def __init__(self) -> None:
-        self.body: list[ast.stmt | list[LazyDeltaOperation]] = []
-        self.attr_to_id: dict[str, int | list[int | tuple[int, ClassAttribute]]] = dict()
+        self.body: Body = Body()
+        self.attr_to_id: AttrIndex = AttrIndex()
     
     def __eq__(self, value):
         if not isinstance(value, ModuleAttribute):
@@ -31,8 +39,8 @@ class ModuleAttribute:
         if len(self.body) != len(value.body) or len(self.attr_to_id) != len(value.attr_to_id):
             return False
         
-        for i in range(len(self.body)):
-            if not ast_util.is_equal(self.body[i], value.body[i]):
+        for statement, other in zip(self.body, value.body):
+            if not ast_util.is_equal(statement, other):
                 return False
         
         return self.attr_to_id == value.attr_to_id
@@ -40,9 +48,81 @@ class ModuleAttribute:
     def __repr__(self):
         return f'ModuleAttribute({repr(self.body)}, {repr(self.attr_to_id)})'
 
+    def occurrences(self, name: str) -> tuple[Occurrence, ...]:
+        '''
+        Every binding of "name" in source order, raises KeyError for unknown names.
+
+        Names bound once by a whole top-level statement are only stored as their
+        position in attr_to_id, the others (attr_to_id entry -1) with their occurrences.
+        '''
+
+        value = self.attr_to_id[name]
+        if isinstance(value, tuple):
+            return (Occurrence(value[0], Binding.CLASS, True),)
+        if value != -1:
+            node = self.body[value]
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                return (Occurrence(value, Binding.FUNCTION, True),)
+            return (Occurrence(value, Binding.ASSIGN, True),)
+        return self.attr_to_id.occurrences(name)
+
+    def fork(self) -> 'ModuleAttribute':
+        '''
+        Copy that operations can modify independently of this one.
+
+        Statements and index entries are shared until replaced, so a fork only
+        costs the changes applied to it. Statements themselves are never copied:
+        operations replace them instead of modifying them in place.
+        '''
+
+        if not isinstance(self.attr_to_id, AttrIndex):
+            self.attr_to_id = AttrIndex(self.attr_to_id)
+
+        forked = type(self).__new__(type(self))
+        forked.body = self.body.fork()
+        forked.attr_to_id = self.attr_to_id.fork()
+        return forked
+
+    def savepoint(self) -> int:
+        '''
+        Record the current state, to go back to with rollback(). Returns the number of savepoints.
+
+        The state is a fork: it costs the changes made since the previous
+        savepoint, and rolling back only replaces the body and the index.
+        '''
+
+        savepoints = getattr(self, '_savepoints', None)
+        if savepoints is None:
+            savepoints = self._savepoints = []
+        savepoints.append(self.fork())
+        return len(savepoints)
+
+    def rollback(self):
+        '''Undo the changes made since the last savepoint, and remove it'''
+
+        saved = self._pop_savepoint()
+        self.body, self.attr_to_id = saved.body, saved.attr_to_id
+
+    def commit(self):
+        '''Keep the changes made since the last savepoint, and remove it'''
+
+        self._pop_savepoint()
+
+    def _pop_savepoint(self) -> 'ModuleAttribute':
+        savepoints = getattr(self, '_savepoints', None)
+        if not savepoints:
+            raise DeltaException('No savepoint')
+        return savepoints.pop()
+
+    def to_module(self) -> ast.Module:
+        '''Module of the current body, with deferred function bodies parsed so that it can be compiled'''
+
+        return ast_util.materialize(ast.Module(body=list(self.body), type_ignores=[]))
+
 class CoreModuleParser(ast.NodeVisitor):
     def __init__(self):
         self.module_attrs = None
+        self.position = -1
         self.top_level_assign = {
             ast.Assign: self.visit_Assign,
             ast.AnnAssign: self.visit_AnnAssign,
@@ -53,88 +133,159 @@ class CoreModuleParser(ast.NodeVisitor):
 
     def parse(self, module_ast: ast.Module):
         module_attrs = ModuleAttribute()
-        module_attrs.body = module_ast.body
+        module_attrs.body = Body(module_ast.body)
         self.module_attrs = module_attrs
 
         for idx, node in enumerate(module_ast.body):
-            if type(node) in self.top_level_assign:
-                self.top_level_assign[type(node)](node, idx=idx)
-            else:
-                self.visit(node)
+            self.index_statement(node, idx)
         return self.module_attrs
 
+    def index_statement(self, node: ast.stmt, idx: int):
+        self.position = idx
+        if type(node) in self.top_level_assign:
+            self.top_level_assign[type(node)](node, idx=idx)
+        else:
+            self.visit(node)
+
+    def bind(self, name: str, kind: Binding, value=-1):
+        '''
+        Record a binding of "name" by the statement being indexed.
+        "value" is the attr_to_id entry of a top-level binding, -1 for the others.
+        '''
+
+        attr_to_id = self.module_attrs.attr_to_id
+        occurrence = Occurrence(self.position, kind, value != -1)
+        if name not in attr_to_id:
+            if value != -1:
+                attr_to_id[name] = value
+            else:
+                attr_to_id.set_occurrences(name, (occurrence,))
+            return
+
+        attr_to_id.set_occurrences(name, self.module_attrs.occurrences(name) + (occurrence,))
+
     def visit_Assign(self, node: ast.Assign, idx = -1):
         if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
-            var_name = node.targets[0].id
-            if var_name in self.module_attrs.attr_to_id:
-                self.module_attrs.attr_to_id[var_name] = -1
-            else:  
-                self.module_attrs.attr_to_id[var_name] = idx
+            self.bind(node.targets[0].id, Binding.ASSIGN, idx)
+        elif all(isinstance(target, ast.Name) for target in node.targets):
+            # "a = b = 1": assignments, but not a whole definition of either name
+            for target in node.targets:
+                self.bind(target.id, Binding.ASSIGN)
+            self.visit(node.value)
         else:
             self.generic_visit(node)
 
     def visit_AnnAssign(self, node: ast.AnnAssign, idx=-1):
         if isinstance(node.target, ast.Name):
-            var_name = node.target.id
-            if var_name in self.module_attrs.attr_to_id:
-                self.module_attrs.attr_to_id[var_name] = -1
-            else:
-                self.module_attrs.attr_to_id[var_name] = idx
+            self.bind(node.target.id, Binding.ASSIGN, idx)
         else:
             self.generic_visit(node)
 
     def visit_FunctionDef(self, node: ast.FunctionDef, idx=-1):
-        var_name = node.name
-        if var_name in self.module_attrs.attr_to_id:
-            self.module_attrs.attr_to_id[var_name] = -1
-        else:
-            self.module_attrs.attr_to_id[var_name] = idx
+        self.bind(node.name, Binding.FUNCTION, idx)
 
     def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef, idx = -1):
-        var_name = node.name
-        if var_name in self.module_attrs.attr_to_id:
-            self.module_attrs.attr_to_id[var_name] = -1
-        else:  
-            self.module_attrs.attr_to_id[var_name] = idx
+        self.bind(node.name, Binding.FUNCTION, idx)
 
     def visit_ClassDef(self, node: ast.ClassDef, idx = -1):
-        var_name = node.name
-        if var_name in self.module_attrs.attr_to_id:
-            self.module_attrs.attr_to_id[var_name] = -1
-        else:
-            class_attr = ClassParser().parse(node)
-            self.module_attrs.attr_to_id[var_name] = (idx, class_attr)
+        self.bind(node.name, Binding.CLASS, (idx, ClassAttribute(node)) if idx != -1 else -1)
 
     def visit_Delete(self, node: ast.Delete):
         for tgt_node in node.targets:
             if isinstance(tgt_node, ast.Name):
-                self.module_attrs.attr_to_id[tgt_node.id] = -1
+                self.bind(tgt_node.id, Binding.DELETE)
 
     def visit_Import(self, node: ast.Import):
         for alias in node.names:
             var_name = alias.asname if alias.asname else alias.name
-            self.module_attrs.attr_to_id[var_name] = -1
+            self.bind(var_name, Binding.IMPORT)
 
     def visit_ImportFrom(self, node):
         for alias in node.names:
             var_name = alias.asname if alias.asname else alias.name
-            self.module_attrs.attr_to_id[var_name] = -1
+            self.bind(var_name, Binding.IMPORT)
 
     def visit_Name(self, node: ast.Name):
         if isinstance(node.ctx, ast.Store):
-            self.module_attrs.attr_to_id[node.id] = -1
+            self.bind(node.id, Binding.TARGET)
 
 class ClassParser(CoreModuleParser):
     def parse(self, class_ast: ast.ClassDef):
         self.module_attrs = ClassAttribute()
+        self.module_attrs.body = Body(class_ast.body)
         for idx, node in enumerate(class_ast.body):
-            if type(node) in self.top_level_assign:
-                self.top_level_assign[type(node)](node, idx=idx)
-            else:
-                self.visit(node)
+            self.index_statement(node, idx)
         return self.module_attrs
 
     def visit_ClassDef(self, node: ast.ClassDef, idx=-1):
         pass
 
-class ClassAttribute(ModuleAttribute): pass
\ No newline at end of file
+class ClassAttribute(ModuleAttribute):
+    '''
+    Index of a class body.
+
+    When created from a ClassDef node, "attr_to_id" is built by ClassParser the
+    first time it is accessed, and "body" wraps the statements of the node the
+    first time it is accessed, so classes only looked up by name keep no Body.
+    '''
+
+    __slots__ = ('_class_ast',)
+
+    def __init__(self, class_ast: ast.ClassDef | None = None) -> None:
+        self._class_ast = class_ast
+        if class_ast is None:
+            super().__init__()
+
+    @property
+    def is_built(self) -> bool:
+        '''Whether attr_to_id is built'''
+
+        return self._class_ast is None or _is_set(self, 'attr_to_id')
+
+    def __getattr__(self, name):
+        # Only reached while the "body" or "attr_to_id" slot is still empty
+        if name == 'attr_to_id' and self._class_ast is not None:
+            self.attr_to_id = ClassParser().parse(self._class_ast).attr_to_id
+        elif name == 'body' and self._class_ast is not None:
+            self.body = Body(self._class_ast.body)
+        else:
+            raise AttributeError(f"'ClassAttribute' object has no attribute '{name}'")
+
+        if _is_set(self, 'body') and _is_set(self, 'attr_to_id'):
+            self._class_ast = None
+        return getattr(self, name)
+
+    def fork(self) -> 'ClassAttribute':
+        if self._class_ast is not None and not self.is_built:
+            return ClassAttribute(self._class_ast)
+
+        # Index built: the fork shares it, and the body wrapping the same statements
+        self.body
+        forked = super().fork()
+        forked._class_ast = None
+        return forked
+
+    def __getstate__(self):
+        if self._class_ast is not None:
+            return (self._class_ast, None, None)
+        return (None, self.body, self.attr_to_id)
+
+    def __setstate__(self, state):
+        self._class_ast, body, attr_to_id = state
+        if self._class_ast is None:
+            self.body = body
+            self.attr_to_id = attr_to_id
+
+    def __repr__(self):
+        if self._class_ast is not None:
+            return f'ClassAttribute(<lazy {self._class_ast.name}>)'
+        return f'ClassAttribute({repr(self.body)}, {repr(self.attr_to_id)})'
+
+def _is_set(attrs: ModuleAttribute, slot: str) -> bool:
+    '''Whether a slot of "attrs" is set, without building it'''
+
+    try:
+        getattr(ModuleAttribute, slot).__get__(attrs)
+    except AttributeError:
+        return False
+    return True
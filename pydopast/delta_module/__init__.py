@@ -1,9 +1,16 @@
 from .operations import (Add, ModifyClass, ModifyFunction, Remove,
-                         VariableAlreadyExisted, VariableNotFound, InvalidModificationTarget)
+                         VariableAlreadyExisted, VariableNotFound, InvalidModificationTarget,
+                         AmbiguousVariable)
 
-from .delta import Delta, DeltaParser, delta_target
+from .delta import (Delta, DeltaParser, DeltaCache, DeltaRegistry, LazyDeltaOperation, Target,
+                    default_registry, delta_target, parse_delta)
+from .module_parser import (DeltaDefinition, DeltaParseError, parse_delta_module, parse_delta_file,
+                            find_deltas)
+from .pack import DeltaPack, PackedDelta, InvalidDeltaPack, StaleDeltaPack, build_pack, load_pack
+from .discovery import ManifestEntry, discover_deltas
+from .batch import DeltaLibraryError, parse_delta_files, parse_delta_functions
+from .optimizer import OptimizationReport, optimize
+from .apply import apply_all
 
 def delta_original(function):
     return function
-
-
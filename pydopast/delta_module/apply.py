@@ -0,0 +1,107 @@
+import ast
+
+from pydopast.core_module import ModuleAttribute, ClassAttribute
+from .operations import (Operation, Add, ModifyClass, ModifyFunction, Remove, VariableAlreadyExisted,
+                         VariableNotFound, InvalidModificationTarget, AmbiguousVariable)
+from .delta import expand_operations
+
+def apply_all(core_module: ModuleAttribute, operations: list[Operation]) -> ModuleAttribute:
+    '''
+    Apply "operations" in order to "core_module", or leave it unchanged when one fails.
+
+    Every operation is first checked against the names the previous ones leave
+    defined: an Add of a defined name raises VariableAlreadyExisted, and the
+    other operations (or the "before" of an Add) on an undefined name raise
+    VariableNotFound, before anything is applied. Members of the classes
+    modified by ModifyClass are checked the same way. The operations are then
+    applied to a fork of the core module, which replaces its body and index
+    once all of them succeeded, so an operation failing for another reason
+    does not leave the module half-modified either.
+
+    This is about failing early and atomically, not speed: each operation is
+    still applied on its own, with its own checks, so apply_all costs a little
+    more than applying the operations in order.
+    '''
+
+    operations = list(expand_operations(operations))
+    _validate(operations, _Names(core_module.attr_to_id), dict(), core_module)
+
+    result = core_module.fork()
+    for operation in operations:
+        operation.apply(result)
+    core_module.body, core_module.attr_to_id = result.body, result.attr_to_id
+    return core_module
+
+class _Names:
+    '''Names defined after the operations checked so far, over those of an index'''
+
+    def __init__(self, index):
+        self.index = index
+        self.added: set[str] = set()
+        self.removed: set[str] = set()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.added or (name not in self.removed and name in self.index)
+
+    def add(self, name: str):
+        self.added.add(name)
+        self.removed.discard(name)
+
+    def remove(self, name: str):
+        self.removed.add(name)
+        self.added.discard(name)
+
+    def is_original(self, name: str) -> bool:
+        '''Whether "name" is still bound as in the index'''
+
+        return name not in self.added and name not in self.removed and name in self.index
+
+def _validate(operations: list[Operation], names: _Names, classes: dict[str, _Names | ast.ClassDef],
+              core_module: ModuleAttribute | None):
+    '''
+    Raise for the first operation on a name that is defined (Add) or undefined (the others).
+    "classes" maps class names to the names of their members, or to their ClassDef
+    when added by the operations and not checked yet.
+    '''
+
+    for operation in operations:
+        if isinstance(operation, Add):
+            for name in operation.names:
+                if name in names:
+                    raise VariableAlreadyExisted(f'Variable "{name}" has been defined in the core module')
+            if operation.before is not None and operation.before not in names:
+                raise VariableNotFound(f'No variable named "{operation.before}" in the core module')
+            for name in operation.names:
+                names.add(name)
+                classes.pop(name, None)
+            if len(operation.names) == 1 and isinstance(operation.tree, ast.ClassDef):
+                classes[operation.names[0]] = operation.tree
+        elif isinstance(operation, (Remove, ModifyFunction, ModifyClass)):
+            name = _target(operation)
+            if name not in names:
+                raise VariableNotFound(f'No variable named "{name}" in the core module')
+            if isinstance(operation, Remove):
+                names.remove(name)
+                classes.pop(name, None)
+            elif isinstance(operation, ModifyClass):
+                _validate(operation.mods, _members(name, names, classes, core_module), dict(), None)
+
+def _target(operation: Remove | ModifyFunction | ModifyClass) -> str:
+    if isinstance(operation, Remove):
+        return operation.name
+    if isinstance(operation, ModifyFunction):
+        return operation.fun_name
+    return operation.class_name
+
+def _members(name: str, names: _Names, classes: dict[str, _Names | ast.ClassDef],
+             core_module: ModuleAttribute | None) -> _Names:
+    if isinstance(classes.get(name), ast.ClassDef):
+        classes[name] = _Names(ClassAttribute(classes[name]).attr_to_id)
+    elif name not in classes:
+        entry = core_module.attr_to_id[name] if core_module is not None and names.is_original(name) else None
+        if entry == -1 and isinstance(core_module.body[core_module.occurrences(name)[-1].position], ast.ClassDef):
+            raise AmbiguousVariable(f'Class "{name}" is bound more than once in the core module')
+        if not isinstance(entry, tuple):
+            raise InvalidModificationTarget('Class', name)
+        classes[name] = _Names(entry[1].attr_to_id)
+    return classes[name]
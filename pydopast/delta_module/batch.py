@@ -0,0 +1,107 @@
+import ast
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from types import FunctionType
+
+from ..utils.source_util import get_source
+from .operations import Operation
+from .delta import DeltaParser
+from .module_parser import DeltaDefinition, DeltaParseError, parse_delta_module
+
+class DeltaLibraryError(Exception):
+    '''
+    Raised by the batch parsers when some deltas fail. "errors" maps
+    (filename, delta name) to every DeltaParseError of the delta (the name is
+    None when the file could not be parsed), "parsed" holds what was parsed.
+    '''
+
+    def __init__(self, errors: dict[tuple[str, str | None], list[DeltaParseError]], parsed):
+        self.errors = errors
+        self.parsed = parsed
+        count = sum(len(delta_errors) for delta_errors in errors.values())
+        details = '\n'.join(f'  {error}' for delta_errors in errors.values() for error in delta_errors)
+        super().__init__(f'{count} error(s) in {len(errors)} delta(s):\n{details}')
+
+def parse_delta_files(paths: list[str], max_workers: int | None = None) -> dict[str, list[DeltaDefinition]]:
+    '''
+    Parse the delta modules at "paths" in a process pool, like parse_delta_file.
+
+    Returns a dict from path to the deltas of the file, in the order of "paths".
+    Every error of every delta is collected and reported together through
+    DeltaLibraryError once all the files have been processed.
+    max_workers=1 parses in the current process.
+    '''
+
+    results = _map(_parse_file, [paths], max_workers)
+
+    parsed = dict()
+    errors = dict()
+    for path, (deltas, file_errors) in zip(paths, results):
+        parsed[path] = deltas
+        for error in file_errors:
+            errors.setdefault((error.filename, error.delta), []).append(error)
+
+    if errors:
+        raise DeltaLibraryError(errors, parsed)
+    return parsed
+
+def parse_delta_functions(functions: list[FunctionType],
+                          max_workers: int | None = None) -> list[tuple[Operation, ...]]:
+    '''
+    Operations of each delta function, parsed in a process pool like parse_delta.
+
+    The sources are read in the current process, so the functions do not need
+    to be importable by the workers. Errors are reported like parse_delta_files,
+    the deltas that failed are None in "parsed".
+    '''
+
+    sources = [get_source(function) for function in functions]
+    filenames = [function.__code__.co_filename for function in functions]
+    linenos = [function.__code__.co_firstlineno for function in functions]
+    results = _map(_parse_function, [sources, filenames, linenos], max_workers)
+
+    parsed = []
+    errors = dict()
+    for function, (operations, delta_errors) in zip(functions, results):
+        parsed.append(operations)
+        if delta_errors:
+            errors[(function.__code__.co_filename, function.__qualname__)] = delta_errors
+
+    if errors:
+        raise DeltaLibraryError(errors, parsed)
+    return parsed
+
+def _map(function, iterables: list[list], max_workers: int | None) -> list:
+    count = len(iterables[0])
+    if max_workers == 1 or count <= 1:
+        return list(map(function, *iterables))
+
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, count // (workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(function, *iterables, chunksize=chunksize))
+
+def _parse_file(path: str) -> tuple[list[DeltaDefinition], list[DeltaParseError]]:
+    errors = []
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+        return parse_delta_module(source, path, errors), errors
+    except (OSError, SyntaxError, ValueError) as e:
+        return [], [DeltaParseError(path, getattr(e, 'lineno', None) or 0, None, str(e))]
+
+def _parse_function(source: str, filename: str,
+                    firstlineno: int) -> tuple[tuple[Operation, ...] | None, list[DeltaParseError]]:
+    tree = ast.parse(source).body[0]
+    parser = DeltaParser()
+    errors = []
+    try:
+        operations = parser.parse_delta_tree(tree, errors)
+    except Exception as e:
+        errors.append((tree, e))
+
+    if errors:
+        return None, [DeltaParseError(filename, firstlineno + node.lineno - 1, tree.name, str(e))
+                      for node, e in errors]
+    return tuple(operations), []
@@ -1,12 +1,140 @@
 import ast
+import enum
+import hashlib
+import os
 
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Any
-from types import ModuleType
+from types import ModuleType, FunctionType
 
 from .operations import Operation, Add, ModifyClass, ModifyFunction, Remove
+from ..utils.source_util import get_source, get_source_at
 
-def delta_target(target: ModuleType | str):
-    return lambda fun: fun
+class Target(enum.Enum):
+    VARIABLE = 1
+    CLASS = 2
+    FUNCTION = 3
+
+@dataclass
+class LazyDeltaOperation(Operation):
+    '''
+    Delta recorded by the file and first line of its definition, only parsed
+    into operations when it is applied (or "operations" is read) the first time.
+    Deltas are functions, the only "type" that can be parsed.
+    '''
+
+    filename: str
+    firstlineno: int
+    type: Target = Target.FUNCTION
+    _operations: tuple[Operation, ...] | None = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def of(cls, delta: FunctionType) -> 'LazyDeltaOperation':
+        code = delta.__code__
+        return cls(code.co_filename, code.co_firstlineno, Target.FUNCTION)
+
+    @property
+    def is_parsed(self) -> bool:
+        return self._operations is not None
+
+    @property
+    def operations(self) -> tuple[Operation, ...]:
+        if self._operations is None:
+            if self.type is not Target.FUNCTION:
+                raise ValueError(f'Cannot parse a delta of type {self.type}')
+            source = get_source_at(self.filename, self.firstlineno)
+            self._operations = tuple(DeltaParser().parse_delta(source))
+        return self._operations
+
+    def apply(self, core_module):
+        for operation in self.operations:
+            operation.apply(core_module)
+        return core_module
+
+    def write_set(self) -> frozenset[str]:
+        return frozenset().union(*(operation.write_set() for operation in self.operations))
+
+def expand_operations(operations: list[Operation]):
+    '''Yield the operations in order, with each LazyDeltaOperation replaced by its own operations'''
+
+    for operation in operations:
+        if isinstance(operation, LazyDeltaOperation):
+            yield from expand_operations(operation.operations)
+        else:
+            yield operation
+
+class DeltaRegistry:
+    '''
+    Delta functions marked by delta_target, indexed by target module.
+
+    A delta registered again under the same module and qualified name (a
+    reloaded delta module) replaces the previous one. The names each delta
+    writes are only known once it is parsed, so the index by name of a target
+    is built on the first "touching" lookup for that target.
+    '''
+
+    def __init__(self):
+        # target -> "module.qualname" -> delta function, in registration order
+        self._by_target: dict[str, dict[str, FunctionType]] = dict()
+        # target -> name -> delta functions writing the name
+        self._by_name: dict[str, dict[str, list[FunctionType]]] = dict()
+
+    def register(self, delta: FunctionType, target: ModuleType | str):
+        target = _target_name(target)
+        self._by_target.setdefault(target, dict())[f'{delta.__module__}.{delta.__qualname__}'] = delta
+        self._by_name.pop(target, None)
+
+    def unregister(self, delta: FunctionType, target: ModuleType | str):
+        target = _target_name(target)
+        deltas = self._by_target.get(target, {})
+        key = f'{delta.__module__}.{delta.__qualname__}'
+        if deltas.get(key) is delta:
+            del deltas[key]
+            self._by_name.pop(target, None)
+
+    def for_target(self, target: ModuleType | str) -> list[FunctionType]:
+        return list(self._by_target.get(_target_name(target), {}).values())
+
+    def touching(self, target: ModuleType | str, name: str) -> list[FunctionType]:
+        '''Deltas of "target" that add, modify or remove its top-level "name"'''
+
+        target = _target_name(target)
+        by_name = self._by_name.get(target)
+        if by_name is None:
+            by_name = self._by_name[target] = dict()
+            for delta in self._by_target.get(target, {}).values():
+                for written in delta.lazy_delta.write_set():
+                    by_name.setdefault(written, []).append(delta)
+        return list(by_name.get(name, ()))
+
+    def targets(self) -> list[str]:
+        return [target for target, deltas in self._by_target.items() if deltas]
+
+    def clear(self):
+        self._by_target.clear()
+        self._by_name.clear()
+
+    def __len__(self) -> int:
+        return sum(len(deltas) for deltas in self._by_target.values())
+
+def _target_name(target: ModuleType | str) -> str:
+    return target.__name__ if isinstance(target, ModuleType) else target
+
+default_registry = DeltaRegistry()
+
+def delta_target(target: ModuleType | str, registry: DeltaRegistry | None = None):
+    '''
+    Mark a delta function of "target" (a module or its name): it is recorded as a
+    LazyDeltaOperation ("lazy_delta") without being parsed, and registered in
+    "registry" (default_registry by default)
+    '''
+
+    def register(fun):
+        fun.lazy_delta = LazyDeltaOperation.of(fun)
+        (default_registry if registry is None else registry).register(fun, target)
+        return fun
+    return register
 
 class Delta:
     def modify(self, function_or_class) -> None:
@@ -27,6 +155,18 @@ class DeltaParser(ast.NodeVisitor):
 
     def parse_delta(self, function_src: str) -> list[Operation]:
         tree: ast.FunctionDef = ast.parse(function_src).body[0]
+        return self.parse_delta_tree(tree)
+
+    def parse_delta_tree(self, tree: ast.FunctionDef,
+                         errors: list[tuple[ast.AST, Exception]] | None = None) -> list[Operation]:
+        '''
+        Operations of an already parsed delta function, whose nodes are reused by the operations.
+
+        When an "errors" list is given, the statements that cannot be parsed are
+        appended to it with their exception and skipped, instead of raising.
+        '''
+
+        self.node = tree
         if len(tree.args.args) == 0:
             raise Exception('Delta wrapper must have at least one argument')
         
@@ -34,9 +174,16 @@ class DeltaParser(ast.NodeVisitor):
         self.variant = tree.args.args[0].arg
 
         for node in tree.body:
-            if type(node) not in ALLOWED_NODES:
-                raise Exception('Top-level delta must be assignments, declarations, or delta.remove calls')
-            self.visit(node)
+            # Statement being parsed, for error locations
+            self.node = node
+            try:
+                if type(node) not in ALLOWED_NODES:
+                    raise Exception('Top-level delta must be assignments, declarations, or delta.remove calls')
+                self.visit(node)
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors.append((node, e))
         return self.res
 
     def visit_ClassDef(self, node):
@@ -138,6 +285,78 @@ class DeltaParser(ast.NodeVisitor):
         self.res.append(new_op)
 
 
+class DeltaCache:
+    '''
+    Bounded LRU of parsed delta functions.
+
+    Entries are keyed by the code object of the delta function and the hash of
+    its current source, so an edited and reloaded delta is parsed again. The
+    source hash of a code object is only computed again when its file changes.
+    The operation tuples are shared by every caller, so they must not be
+    modified when applied: operations replace the statements of the core
+    module with new nodes, and keep their own trees and attributes unchanged.
+    '''
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[Operation, ...]] = OrderedDict()
+        # code object -> (file stamp, source hash)
+        self._digests: dict = dict()
+
+    def _digest(self, delta: FunctionType) -> tuple[bytes, str | None]:
+        code = delta.__code__
+        try:
+            stat = os.stat(code.co_filename)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+
+        known = self._digests.get(code)
+        if known is not None and stamp is not None and known[0] == stamp:
+            return known[1], None
+
+        source = get_source(delta)
+        digest = hashlib.sha256(source.encode('utf-8')).digest()
+        self._digests[code] = (stamp, digest)
+        return digest, source
+
+    def parse(self, delta: FunctionType) -> tuple[Operation, ...]:
+        digest, source = self._digest(delta)
+        key = (delta.__code__, digest)
+
+        operations = self._entries.get(key)
+        if operations is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return operations
+
+        self.misses += 1
+        if source is None:
+            source = get_source(delta)
+        operations = tuple(DeltaParser().parse_delta(source))
+        self._entries[key] = operations
+        if len(self._entries) > self.maxsize:
+            (code, _), _ = self._entries.popitem(last=False)
+            self._digests.pop(code, None)
+        return operations
+
+    def clear(self):
+        self._entries.clear()
+        self._digests.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+_default_cache = DeltaCache()
+
+def parse_delta(delta: FunctionType) -> tuple[Operation, ...]:
+    '''Operations of a delta function, parsed once and memoized in a shared DeltaCache'''
+
+    return _default_cache.parse(delta)
+
 class NameCollector(ast.NodeVisitor):
     def collect(self, target: list | ast.Tuple, variant):
         self.names = []
@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+
+from ..core_module.package import find_modules
+from .operations import Add, ModifyClass, ModifyFunction, Remove
+from .module_parser import DeltaDefinition, parse_delta_file
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    '''A delta found by discover_deltas, and the names of the target module it touches'''
+
+    module: str
+    filename: str
+    name: str
+    # Argument of delta_target: a module name, or the source of the expression
+    target: str
+    lineno: int
+    adds: frozenset[str]
+    modifies: frozenset[str]
+    removes: frozenset[str]
+
+    @property
+    def write_set(self) -> frozenset[str]:
+        return self.adds | self.modifies | self.removes
+
+    @classmethod
+    def of(cls, delta: DeltaDefinition, module: str, filename: str) -> 'ManifestEntry':
+        adds, modifies, removes = set(), set(), set()
+        for operation in delta.operations:
+            if isinstance(operation, Add):
+                adds.update(operation.names)
+            elif isinstance(operation, (ModifyFunction, ModifyClass)):
+                modifies.update(operation.write_set())
+            elif isinstance(operation, Remove):
+                removes.add(operation.name)
+        return cls(module, filename, delta.name, delta.target, delta.lineno,
+                   frozenset(adds), frozenset(modifies), frozenset(removes))
+
+def discover_deltas(directory: str) -> list[ManifestEntry]:
+    '''
+    Manifest of every delta under "directory", by module name then source order.
+
+    Delta modules are only read and parsed, never imported: their top-level
+    code does not run, and the modules they import do not need to be installed.
+    Raises DeltaParseError for the first delta that cannot be parsed.
+    '''
+
+    manifest = []
+    for module, path in find_modules(directory).items():
+        manifest.extend(ManifestEntry.of(delta, module, path) for delta in parse_delta_file(path))
+    return manifest
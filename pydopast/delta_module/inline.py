@@ -0,0 +1,228 @@
+import ast
+import copy
+import re
+
+from pydopast.utils import ast_util
+
+# Names whose use depends on the frame of the function
+_FRAME_NAMES = frozenset(('locals', 'vars', 'eval', 'exec', 'super', 'dir'))
+
+# Statements of the previous version that bind or unbind names in ways the inliner does not rename
+_UNSUPPORTED = (
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Global, ast.Nonlocal, ast.Import, ast.ImportFrom,
+    ast.Delete, ast.Match, ast.NamedExpr, ast.Yield, ast.YieldFrom, ast.Await, ast.AsyncFor, ast.AsyncWith,
+)
+
+# Node type -> fields in evaluation order, for the nodes the call to "original" may be nested in
+_EVALUATION_ORDER = {
+    ast.Return: ('value',),
+    ast.Expr: ('value',),
+    # Assignment targets are evaluated after the value
+    ast.Assign: ('value',),
+    ast.AnnAssign: ('value',),
+    ast.BinOp: ('left', 'right'),
+    ast.UnaryOp: ('operand',),
+    ast.Tuple: ('elts',),
+    ast.List: ('elts',),
+    ast.Set: ('elts',),
+    ast.Call: ('func', 'args', 'keywords'),
+    ast.keyword: ('value',),
+    ast.Attribute: ('value',),
+    ast.Subscript: ('value', 'slice'),
+    ast.FormattedValue: ('value',),
+    ast.JoinedStr: ('values',),
+}
+
+def inline_original(tree: ast.FunctionDef, previous: ast.FunctionDef) -> ast.FunctionDef | None:
+    '''
+    "tree" with its single call to "original" replaced by the body of "previous",
+    or None when this would not behave like calling the previous version.
+
+    The call must be the only use of "original", in a top-level return,
+    expression or assignment, and only constants and locals of "tree" may be
+    evaluated before it in that statement: a global could be changed by the
+    previous version, which now runs first. The previous version must return at most once,
+    as its last statement, take no *args or **kwargs, have constant defaults,
+    define no functions or classes, and not refer to itself. Its parameters and
+    locals are renamed to fresh names, and none of the other names it reads may
+    be bound by "tree".
+    '''
+
+    if not isinstance(tree, ast.FunctionDef) or not isinstance(previous, ast.FunctionDef) \
+            or previous.decorator_list or previous.type_params:
+        return None
+
+    located = _find_call(tree)
+    if located is None:
+        return None
+    index, path, call = located
+
+    previous_nodes = list(_walk(previous.body))
+    stored = _stored_names(previous, previous_nodes)
+    if stored is None:
+        return None
+    arguments = _bind(previous.args, call)
+    if arguments is None:
+        return None
+    local_names = stored | {name for name, _ in arguments}
+
+    used = _names(previous_nodes)
+    for name in used - local_names:
+        if ast_util.binds(tree, name):
+            # Would be captured by a local of the new function
+            return None
+
+    taken = _names(_walk(tree.body)) | {arg.arg for arg in ast.walk(tree.args) if isinstance(arg, ast.arg)} | used
+    renames = dict()
+    statements = []
+    for name, value in arguments:
+        # Always a fresh name: a local of the new function passed as argument
+        # may be rebound later, and closures of the previous version must not see it
+        renames[name] = _fresh(name, taken)
+        statements.append(ast.copy_location(ast.Assign(
+            targets=[ast.copy_location(ast.Name(renames[name], ctx=ast.Store()), call)], value=value
+        ), call))
+    for name in sorted(stored - renames.keys()):
+        renames[name] = _fresh(name, taken)
+
+    body = list(previous.body)
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        # The docstring of the previous version is not one of the new function
+        body = body[1:]
+    body = ast_util.clone(body)
+    _rename_locals(body, renames)
+    result = ast.Constant(None)
+    if body and isinstance(body[-1], ast.Return):
+        result = body.pop().value or result
+    statements.extend(body)
+    ast.copy_location(result, call)
+
+    # Copy the nodes from the statement to the call, the others are shared with "tree"
+    replacement = result
+    for node, field, position in reversed(path):
+        node = copy.copy(node)
+        if position is None:
+            setattr(node, field, replacement)
+        else:
+            values = list(getattr(node, field))
+            values[position] = replacement
+            setattr(node, field, values)
+        replacement = node
+
+    inlined = copy.copy(tree)
+    inlined.body = [*tree.body[:index], *statements, replacement, *tree.body[index + 1:]]
+    return inlined
+
+def _find_call(tree: ast.FunctionDef) -> tuple[int, list, ast.Call] | None:
+    uses = [node for node in _walk(tree.body) if isinstance(node, ast.Name) and node.id == 'original']
+    if len(uses) != 1:
+        return None
+
+    index = next(i for i, statement in enumerate(tree.body) if _contains(statement, uses[0]))
+    path = []
+    node = tree.body[index]
+    while not (isinstance(node, ast.Call) and node.func is uses[0]):
+        fields = _EVALUATION_ORDER.get(type(node))
+        if fields is None:
+            return None
+
+        child = None
+        for field in fields:
+            value = getattr(node, field)
+            for position, item in (enumerate(value) if isinstance(value, list) else [(None, value)]):
+                if child is None and item is not None and _contains(item, uses[0]):
+                    child = (field, position, item)
+                elif child is None and item is not None and not _is_pure(item, tree):
+                    # Evaluated before the call, it would now run after the inlined body
+                    return None
+        if child is None:
+            return None
+        field, position, item = child
+        path.append((node, field, position))
+        node = item
+    return index, path, node
+
+def _walk(statements: list[ast.stmt]):
+    for statement in statements:
+        yield from ast.walk(statement)
+
+def _contains(node: ast.AST, target: ast.AST) -> bool:
+    return any(child is target for child in ast.walk(node))
+
+def _is_pure(node: ast.AST, tree: ast.FunctionDef) -> bool:
+    if isinstance(node, ast.Constant):
+        return True
+    return isinstance(node, ast.Name) and ast_util.binds(tree, node.id) and not any(
+        isinstance(child, (ast.Global, ast.Nonlocal)) and node.id in child.names
+        for child in ast_util.scope_nodes(tree.body)
+    )
+
+def _stored_names(previous: ast.FunctionDef, nodes: list[ast.AST]) -> set[str] | None:
+    '''Names assigned by the previous version, or None when it cannot be inlined'''
+
+    args = previous.args
+    if args.vararg or args.kwarg:
+        return None
+
+    for node in nodes:
+        if isinstance(node, _UNSUPPORTED):
+            return None
+        if isinstance(node, ast.Name) and (node.id in _FRAME_NAMES or node.id == previous.name):
+            return None
+
+    names = set()
+    for node in ast_util.scope_nodes(list(previous.body)):
+        if isinstance(node, ast.Return) and node is not previous.body[-1]:
+            # An early return would not leave the new function's statement
+            return None
+        if isinstance(node, ast.ExceptHandler) and node.name:
+            return None
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+    return names
+
+def _names(nodes) -> set[str]:
+    return {node.id if isinstance(node, ast.Name) else node.arg
+            for node in nodes if isinstance(node, (ast.Name, ast.arg))}
+
+def _fresh(name: str, taken: set[str]) -> str:
+    base = re.sub(r'(_\d+)+$', '', name.lstrip('_')) or 'value'
+    n = 1
+    while f'_{base}_{n}' in taken:
+        n += 1
+    taken.add(f'_{base}_{n}')
+    return f'_{base}_{n}'
+
+def _bind(args: ast.arguments, call: ast.Call) -> list[tuple[str, ast.expr]] | None:
+    positional = [arg.arg for arg in args.posonlyargs + args.args]
+    if len(call.args) > len(positional) or any(isinstance(arg, ast.Starred) for arg in call.args):
+        return None
+
+    bound = list(zip(positional, call.args))
+    keyword_names = {arg.arg for arg in args.args + args.kwonlyargs}
+    for keyword in call.keywords:
+        if keyword.arg is None or keyword.arg not in keyword_names or keyword.arg in dict(bound):
+            return None
+        bound.append((keyword.arg, keyword.value))
+
+    names = dict(bound)
+    defaults = dict(zip(positional[len(positional) - len(args.defaults):], args.defaults))
+    defaults.update((arg.arg, default) for arg, default in zip(args.kwonlyargs, args.kw_defaults) if default)
+    for name in positional + [arg.arg for arg in args.kwonlyargs]:
+        if name in names:
+            continue
+        default = defaults.get(name)
+        if not isinstance(default, ast.Constant):
+            # Missing, or not evaluated once like a default value
+            return None
+        bound.append((name, default))
+    return bound
+
+def _rename_locals(body: list[ast.stmt], renames: dict[str, str]):
+    for node in ast_util.scope_nodes(body):
+        if isinstance(node, ast.Name) and node.id in renames:
+            node.id = renames[node.id]
+        elif isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            for old, new in renames.items():
+                ast_util.rename_free(node, old, new)
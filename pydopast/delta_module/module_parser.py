@@ -0,0 +1,104 @@
+import ast
+
+from dataclasses import dataclass, field
+
+from .operations import Operation
+from .delta import DeltaParser
+
+class DeltaParseError(Exception):
+    '''
+    A delta could not be parsed, "lineno" is the line of the offending statement in "filename".
+    "delta" is None when the whole file could not be parsed.
+    '''
+
+    def __init__(self, filename: str, lineno: int, delta: str | None, message: str):
+        self.filename = filename
+        self.lineno = lineno
+        self.delta = delta
+        self.message = message
+        location = f' in delta "{delta}":' if delta is not None else ''
+        super().__init__(f'{filename}:{lineno}:{location} {message}')
+
+    def __reduce__(self):
+        return (DeltaParseError, (self.filename, self.lineno, self.delta, self.message))
+
+@dataclass
+class DeltaDefinition:
+    name: str
+    # Argument of delta_target: a module name, or the source of the expression
+    target: str
+    lineno: int
+    operations: tuple[Operation, ...]
+    # Names of the target module written by the operations
+    write_set: frozenset[str] = field(init=False)
+
+    def __post_init__(self):
+        self.write_set = frozenset().union(*(operation.write_set() for operation in self.operations))
+
+def parse_delta_module(source: str | bytes, filename: str = '<unknown>',
+                       errors: list[DeltaParseError] | None = None) -> list[DeltaDefinition]:
+    '''
+    Parse every delta of a delta module, in source order.
+
+    The module is parsed once, and each top-level function decorated with
+    delta_target is handed to DeltaParser as a subtree, so line numbers of the
+    operations and of the errors are those of the file.
+
+    When an "errors" list is given, every statement that cannot be parsed is
+    appended to it as a DeltaParseError and the deltas containing one are
+    left out, instead of raising at the first error.
+    '''
+
+    module_ast = ast.parse(source, filename)
+    deltas = []
+    for node, target in find_deltas(module_ast):
+        parser = DeltaParser()
+        delta_errors = None if errors is None else []
+        try:
+            operations = parser.parse_delta_tree(node, delta_errors)
+        except Exception as e:
+            error = DeltaParseError(filename, getattr(parser, 'node', node).lineno, node.name, str(e))
+            if errors is None:
+                raise error from e
+            delta_errors.append((node, e))
+
+        if delta_errors:
+            errors.extend(DeltaParseError(filename, statement.lineno, node.name, str(e))
+                          for statement, e in delta_errors)
+            continue
+        deltas.append(DeltaDefinition(node.name, target, node.lineno, tuple(operations)))
+    return deltas
+
+def parse_delta_file(filename: str) -> list[DeltaDefinition]:
+    with open(filename, 'rb') as f:
+        source = f.read()
+    return parse_delta_module(source, filename)
+
+def find_deltas(module_ast: ast.Module) -> list[tuple[ast.FunctionDef, str]]:
+    '''Top-level functions decorated with delta_target, and the target of each'''
+
+    # Names delta_target may be imported as ("from pydopast.delta_module import delta_target as dt")
+    aliases = {'delta_target'}
+    for node in module_ast.body:
+        if isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name == 'delta_target' and alias.asname:
+                    aliases.add(alias.asname)
+
+    deltas = []
+    for node in module_ast.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for dec in node.decorator_list:
+            if not isinstance(dec, ast.Call) or len(dec.args) != 1:
+                continue
+            fun = dec.func
+            if (isinstance(fun, ast.Name) and fun.id in aliases) \
+                    or (isinstance(fun, ast.Attribute) and fun.attr == 'delta_target'):
+                target = dec.args[0]
+                if isinstance(target, ast.Constant) and isinstance(target.value, str):
+                    deltas.append((node, target.value))
+                else:
+                    deltas.append((node, ast.unparse(target)))
+                break
+    return deltas
@@ -8,10 +8,12 @@ import copy
 
 from abc import ABC, abstractmethod
 from pydopast.utils import ast_util
-from pydopast.core_module import ModuleAttribute, ClassParser
+from . import inline
+from pydopast.core_module import ModuleAttribute, ClassAttribute, Binding, Occurrence
 
 class VariableAlreadyExisted(Exception): pass
 class VariableNotFound(Exception): pass
+class AmbiguousVariable(Exception): pass
 class InvalidModificationTarget(Exception):
     def __init__(self, expected, actual):
         super().__init__(f'Invalid delta modification target: "{actual}" is not a "{expected}"')
@@ -21,23 +23,65 @@ class Operation(ABC):
     def apply(self, core_module):
         raise NotImplementedError
 
+    @abstractmethod
+    def write_set(self) -> frozenset[str]:
+        '''Top-level names of the core module the operation adds, modifies or removes'''
+        raise NotImplementedError
+
+def resolve(core_module: ModuleAttribute, name: str) -> int:
+    '''Position of the statement that defines "name" last, when it is a whole top-level definition'''
+
+    if name not in core_module.attr_to_id:
+        raise VariableNotFound(f'No variable named "{name}" in the core module')
+
+    occurrences = core_module.occurrences(name)
+    if not occurrences or not occurrences[-1].top_level:
+        raise AmbiguousVariable(
+            f'Variable "{name}" is not defined last by a top-level statement of the core module'
+        )
+    return occurrences[-1].position
+
 class Add(Operation):
-    def __init__(self, names: list[str], tree: ast.stmt):
+    def __init__(self, names: list[str], tree: ast.stmt, before: str | None = None):
+        '''Appended to the core module, or inserted before the definition of "before"'''
+
         self.names = names
         self.tree = tree
+        self.before = before
 
     def apply(self, core_module: ModuleAttribute):
-        body_entry = len(core_module.body) if len(self.names) == 1 else -1
-        
-        if body_entry != -1 and isinstance(self.tree, ast.ClassDef):
-            body_entry = (body_entry, ClassParser().parse(self.tree))
-
         for name in self.names:
             if name in core_module.attr_to_id:
                 raise VariableAlreadyExisted(f'Variable "{name}" has been defined in the core module')
-            core_module.attr_to_id[name] = body_entry
-        
-        core_module.body.append(self.tree)            
+
+        if self.before is None:
+            body_entry = core_module.body.append(self.tree)
+        else:
+            body_entry = core_module.body.insert_before(resolve(core_module, self.before), self.tree)
+
+        # Bound as the core module parser would bind them
+        tree = self.tree
+        whole = len(self.names) == 1 and (
+            isinstance(tree, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.AnnAssign))
+            or (isinstance(tree, ast.Assign) and len(tree.targets) == 1 and isinstance(tree.targets[0], ast.Name))
+        )
+        if isinstance(tree, (ast.Import, ast.ImportFrom)):
+            kind = Binding.IMPORT
+        elif isinstance(tree, ast.Assign) and all(isinstance(target, ast.Name) for target in tree.targets):
+            kind = Binding.ASSIGN
+        else:
+            kind = Binding.TARGET
+        for name in self.names:
+            if not whole:
+                core_module.attr_to_id.set_occurrences(name, (Occurrence(body_entry, kind, False),))
+            elif isinstance(self.tree, ast.ClassDef):
+                core_module.attr_to_id[name] = (body_entry, ClassAttribute(self.tree))
+            else:
+                core_module.attr_to_id[name] = body_entry
+        return core_module
+
+    def write_set(self) -> frozenset[str]:
+        return frozenset(self.names)
 
     def __eq__(self, value):
         if not value:
@@ -46,97 +90,120 @@ class Add(Operation):
         if not isinstance(value, Add):
             return False
 
-        return (self.names == value.names) and ast_util.is_equal(self.tree, value.tree)
+        return (self.names == value.names) and self.before == value.before \
+                and ast_util.is_equal(self.tree, value.tree)
 
     def __repr__(self):
+        if self.before is not None:
+            return f'Add({self.names}, {ast.dump(self.tree)}, before={self.before!r})'
         return f'Add({self.names}, {ast.dump(self.tree)})'
 
 class ModifyFunction(Operation):
-    def __init__(self, function_name: str, tree: ast.FunctionDef | ast.AsyncFunctionDef):
+    # Emit the previous version as a module-level function instead of nesting it in the new one
+    hoist_original = False
+    # Splice the previous version into the new one when it is called once and this is safe
+    inline_original = False
+
+    def __init__(self, function_name: str, tree: ast.FunctionDef | ast.AsyncFunctionDef,
+                 hoist_original: bool | None = None, inline_original: bool | None = None):
         self.fun_name = function_name
         self.tree = tree
+        if hoist_original is not None:
+            self.hoist_original = hoist_original
+        if inline_original is not None:
+            self.inline_original = inline_original
 
-        self.need_original = False
-        checker = OriginalSearch()
-        for node in tree.body:
-            if checker.need_original(node):
-                self.need_original = True
-                break                
+        self.need_original = OriginalSearch().need_original(tree.body)
 
     def apply(self, core_module: ModuleAttribute):
-        if self.fun_name not in core_module.attr_to_id:
-            raise VariableNotFound(f'No variable named "{self.fun_name}" in the core module')
-
-        fun_id = core_module.attr_to_id[self.fun_name]
+        fun_id = resolve(core_module, self.fun_name)
         original_tree = core_module.body[fun_id]
         if not (isinstance(original_tree, ast.FunctionDef) or (isinstance(original_tree, ast.AsyncFunctionDef))):
             raise InvalidModificationTarget('Function', self.fun_name)
 
         if not self.need_original:
             core_module.body[fun_id] = self.tree
+        elif self.inline_original and (inlined := inline.inline_original(self.tree, original_tree)) is not None:
+            core_module.body[fun_id] = inlined
+        elif self.hoist_original and not isinstance(core_module, ClassAttribute) \
+                and not original_tree.decorator_list:
+            # A hoisted method would not be visible from the other methods, and
+            # decorators of a hoisted function would run once instead of per call
+            self.__hoist(core_module, fun_id, original_tree)
         else:
             #TODO: Make copy original function lazy
             original_fun = self.__clone_function_header(original_tree)
-            original_fun.body = [
-                original_tree,
-                self.__fun_arg_def_to_call(original_tree.args)
-            ]
-            
-            old_body = self.tree.body
-            self.tree.body = None
-            new_tree= copy.deepcopy(self.tree)
-            
-            new_body = [original_fun]
-            for body in old_body:
-                new_body.append(body)
-
-            new_tree.body = new_body
-            self.tree.body = old_body
+            call = self.__fun_arg_def_to_call(original_tree)
+            if isinstance(original_tree, ast.AsyncFunctionDef):
+                # "original" is async too: its callers await the result of the previous version
+                call = ast.copy_location(ast.Await(call), original_tree)
+            original_fun.body = [original_tree, ast.copy_location(ast.Return(call), original_tree)]
+
+            # Shallow copy: the new function shares every node of self.tree and
+            # of the original function, neither of which is modified
+            new_tree = copy.copy(self.tree)
+            new_tree.body = [original_fun, *self.tree.body]
             core_module.body[fun_id] = new_tree
 
         return core_module
 
+    def __hoist(self, core_module: ModuleAttribute, fun_id: int,
+                original_tree: ast.FunctionDef | ast.AsyncFunctionDef):
+        '''
+        Insert the previous version before the function as "_original_<name>_<n>",
+        and replace the function by self.tree calling it instead of "original".
+
+        Only used for undecorated previous versions. Its recursive calls still
+        reach itself, as they did when it was nested: they are renamed too.
+        '''
+
+        n = 1
+        while f'_original_{self.fun_name}_{n}' in core_module.attr_to_id:
+            n += 1
+        name = f'_original_{self.fun_name}_{n}'
+
+        hoisted = copy.copy(original_tree)
+        hoisted.name = name
+        if ast_util.mentions(original_tree.body, self.fun_name):
+            function = ast_util.clone(hoisted)
+            if ast_util.rename_free(function, self.fun_name, name):
+                hoisted = function
+
+        # Built on every apply: the operation is shared, and never modified
+        new_tree = ast_util.clone(self.tree)
+        ast_util.rename_free(new_tree, 'original', name)
+
+        core_module.attr_to_id[name] = core_module.body.insert_before(fun_id, hoisted)
+        core_module.body[fun_id] = new_tree
+
+    def write_set(self) -> frozenset[str]:
+        return frozenset((self.fun_name,))
+
     def __clone_function_header(self, function: ast.FunctionDef | ast.AsyncFunctionDef):
-        if isinstance(function, ast.FunctionDef):
-            return ast.FunctionDef(
-                name='original', args=function.args, 
-                returns=function.returns, type_params=function.type_params,
-                type_comment=function.type_comment
-            )
-        else:
-            return ast.AsyncFunctionDef(
-                name='original', args=function.args, 
-                returns=function.returns, type_params=function.type_params,
-                type_comment=function.type_comment
-            )
-    
-    def __fun_arg_def_to_call(self, arguments: ast.arguments):
+        header_type = ast.FunctionDef if isinstance(function, ast.FunctionDef) else ast.AsyncFunctionDef
+        return ast.copy_location(header_type(
+            name='original', args=function.args,
+            returns=function.returns, type_params=function.type_params,
+            type_comment=function.type_comment
+        ), function)
+
+    def __fun_arg_def_to_call(self, function: ast.FunctionDef | ast.AsyncFunctionDef):
+        arguments = function.args
+        def load(name):
+            return ast.copy_location(ast.Name(name, ctx=ast.Load()), function)
+
         args = []
-        for arg in arguments.args:
-            args.append(ast.Name(arg.arg, ctx=ast.Load()))
+        for arg in arguments.posonlyargs + arguments.args:
+            args.append(load(arg.arg))
         if arguments.vararg:
-            args.append(
-                ast.Starred(
-                    value=ast.Name(arguments.vararg.arg, ctx=ast.Load()),
-                    ctx=ast.Load()
-                )
-            )
+            args.append(ast.copy_location(ast.Starred(value=load(arguments.vararg.arg), ctx=ast.Load()), function))
         keywords = []
         for kw in arguments.kwonlyargs:
-            keywords.append(
-                ast.keyword(
-                    arg=kw.arg, value=ast.Name(id=kw.arg, ctx=ast.Load())
-                )
-            )
+            keywords.append(ast.copy_location(ast.keyword(arg=kw.arg, value=load(kw.arg)), function))
         if arguments.kwarg:
-            keywords.append(
-                ast.keyword(value=ast.Name(id=arguments.kwarg.arg, ctx=ast.Load()))
-            )
+            keywords.append(ast.copy_location(ast.keyword(value=load(arguments.kwarg.arg)), function))
 
-        return ast.Call(
-            func=ast.Name(id=self.fun_name, ctx=ast.Load()),
-            args=args, keywords=keywords
-        )
+        return ast.copy_location(ast.Call(func=load(self.fun_name), args=args, keywords=keywords), function)
 
     def __eq__(self, value):
         if not value:
@@ -145,7 +212,8 @@ class ModifyFunction(Operation):
         if not isinstance(value, ModifyFunction):
             return False
 
-        return (self.fun_name == value.fun_name) and ast_util.is_equal(self.tree, value.tree)
+        return (self.fun_name == value.fun_name) and self.hoist_original == value.hoist_original \
+                and self.inline_original == value.inline_original and ast_util.is_equal(self.tree, value.tree)
     
     def __repr__(self):
         return f'ModifyFunction({self.fun_name}, {ast.dump(self.tree)})'
@@ -158,9 +226,52 @@ class ModifyClass(Operation):
         self.mods = modifications
         self.tree = tree
 
-    def apply(self, core_module):
+    def apply(self, core_module: ModuleAttribute):
+        '''
+        Apply the member operations to the ClassAttribute of the class, and
+        replace the class by a copy of it with the merged header and the new body.
+
+        Bases missing from the class are appended to its bases, keywords
+        (metaclass=...) replace those of the same name, and decorators missing
+        from the class are applied after its own. Members are found through the
+        index of the class, which is forked first: the ClassDef and the index
+        shared with forks of the core module are never modified.
+        '''
+
+        class_id = resolve(core_module, self.class_name)
+        entry = core_module.attr_to_id[self.class_name]
+        original_tree = core_module.body[class_id]
+        if not isinstance(original_tree, ast.ClassDef):
+            raise InvalidModificationTarget('Class', self.class_name)
+        if not isinstance(entry, tuple):
+            # Members are only indexed for a class bound once
+            raise AmbiguousVariable(f'Class "{self.class_name}" is bound more than once in the core module')
+
+        class_attr = entry[1].fork()
+        for operation in self.mods:
+            operation.apply(class_attr)
+
+        new_tree = copy.copy(original_tree)
+        new_tree.bases = original_tree.bases + [
+            base for base in self.tree.bases
+            if not any(ast_util.is_equal(base, other) for other in original_tree.bases)
+        ]
+        keywords = {keyword.arg: keyword for keyword in self.tree.keywords}
+        new_tree.keywords = [keywords.pop(keyword.arg, keyword) for keyword in original_tree.keywords] \
+                + list(keywords.values())
+        new_tree.decorator_list = [
+            dec for dec in self.tree.decorator_list
+            if not any(ast_util.is_equal(dec, other) for other in original_tree.decorator_list)
+        ] + original_tree.decorator_list
+        new_tree.body = list(class_attr.body) or [ast.copy_location(ast.Pass(), original_tree)]
+
+        core_module.body[class_id] = new_tree
+        core_module.attr_to_id[self.class_name] = (class_id, class_attr)
         return core_module
 
+    def write_set(self) -> frozenset[str]:
+        return frozenset((self.class_name,))
+
     def __eq__(self, value):
         if not value:
             return False
@@ -182,12 +293,23 @@ class Remove(Operation):
     def apply(self, core_module: ModuleAttribute):
         if self.name not in core_module.attr_to_id:
             raise VariableNotFound(f'No variable "{self.name}" in the core module')
-        
-        body_id = core_module.attr_to_id[self.name]
-        core_module.body[body_id] = None
+
+        occurrences = core_module.occurrences(self.name)
+        for occurrence in occurrences:
+            if not occurrence.top_level:
+                raise AmbiguousVariable(
+                    f'Variable "{self.name}" is also bound by a {occurrence.kind.value} '
+                    f'(statement {occurrence.position}), only whole definitions can be removed'
+                )
+
+        for occurrence in occurrences:
+            del core_module.body[occurrence.position]
         del core_module.attr_to_id[self.name]
         return core_module
 
+    def write_set(self) -> frozenset[str]:
+        return frozenset((self.name,))
+
     def __eq__(self, value):
         if not value:
             return False
@@ -201,39 +323,28 @@ class Remove(Operation):
         return f'Remove({self.name})'
     
 
-class OriginalSearch(ast.NodeVisitor):
-    def need_original(self, node):
-        self.orignal_name = 'original'
-        return self.visit(node) == True
-
-    def visit_Name(self, node):
-        if node.id == self.orignal_name:
-            if isinstance(node.ctx, ast.Store):
-                return False
-            else:
-                return True
-        return False
-
-    def visit_FunctionDef(self, node):
-        if node.name == self.orignal_name:
-            return False
+class OriginalSearch:
+    '''Whether a function body reads "original", when the body does not bind the name itself'''
 
-    def visit_AsyncFunctionDef(self, node):
-        if node.name == self.orignal_name:
-            return False
+    orignal_name = 'original'
 
-    def visit_ClassDef(self, node):
-        if node.name == self.orignal_name:
+    def need_original(self, body: list[ast.stmt]) -> bool:
+        if any(self.__binds(node) for node in body):
             return False
+        return any(
+            isinstance(child, ast.Name) and child.id == self.orignal_name and isinstance(child.ctx, ast.Load)
+            for node in body for child in ast.walk(node)
+        )
 
-    def visit_Import(self, node):
-        for name in node.names:
-            var_name = name.asname if name.asname else name.name
-            if var_name == self.orignal_name:
-                return False
-    
-    def visit_ImportFrom(self, node):
-        for name in node.names:
-            var_name = name.asname if name.asname else name.name
-            if var_name == self.orignal_name:
-                return False
\ No newline at end of file
+    def __binds(self, node: ast.stmt) -> bool:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return node.name == self.orignal_name
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return any((name.asname or name.name) == self.orignal_name for name in node.names)
+        if isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            return any(
+                isinstance(child, ast.Name) and child.id == self.orignal_name
+                for target in targets for child in ast.walk(target)
+            )
+        return False
@@ -0,0 +1,116 @@
+import ast
+
+from dataclasses import dataclass, field
+
+from .operations import Operation, Add, ModifyFunction, Remove
+from .delta import expand_operations
+from .inline import inline_original
+
+@dataclass
+class OptimizationReport:
+    '''What optimize did to an operation sequence'''
+
+    # Operations left out, and why
+    eliminated: list[tuple[Operation, str]] = field(default_factory=list)
+    # Operations replaced by a single equivalent one
+    fused: list[tuple[tuple[Operation, ...], Operation]] = field(default_factory=list)
+
+    def __str__(self):
+        lines = [f'{len(self.eliminated)} operation(s) eliminated, {len(self.fused)} fusion(s)']
+        lines += [f'  eliminated {operation!r}: {reason}' for operation, reason in self.eliminated]
+        lines += [f'  fused {len(operations)} operations into {operation!r}' for operations, operation in self.fused]
+        return '\n'.join(lines)
+
+def optimize(operations: list[Operation]) -> tuple[list[Operation], OptimizationReport]:
+    '''
+    Equivalent, shorter operation sequence, and a report of the changes.
+
+    Deltas (LazyDeltaOperation) are expanded into their operations, then:
+
+    - an Add of a single name that is later removed is cancelled with the
+      Remove, together with the ModifyFunctions of the name in between;
+    - a ModifyFunction that does not call original discards the previous
+      ModifyFunctions of the name, and is merged into the Add of the name;
+    - a ModifyFunction calling original is fused with the previous
+      ModifyFunction of the name when inline_original can splice it in.
+
+    Any other operation adding, modifying, removing or inserting before a name
+    ends these sequences for the name. The result is the same as applying the
+    original sequence, when that sequence applies without errors.
+    '''
+
+    report = OptimizationReport()
+    result: list[Operation | None] = []
+    # Name -> positions in result of its Add and the ModifyFunctions following it
+    added: dict[str, list[int]] = dict()
+    # Name -> positions in result of its last ModifyFunctions
+    modified: dict[str, list[int]] = dict()
+
+    for operation in expand_operations(operations):
+        if isinstance(operation, Remove) and operation.name in added:
+            for position in added.pop(operation.name):
+                report.eliminated.append((result[position], f'"{operation.name}" is removed later'))
+                result[position] = None
+            modified.pop(operation.name, None)
+            report.eliminated.append((operation, f'"{operation.name}" was added by the sequence'))
+            continue
+
+        if isinstance(operation, ModifyFunction):
+            operation = _modify(operation, result, added, modified, report)
+            if operation is None:
+                continue
+
+        if not isinstance(operation, ModifyFunction):
+            for name in _touched(operation):
+                added.pop(name, None)
+                modified.pop(name, None)
+        result.append(operation)
+        if isinstance(operation, Add) and len(operation.names) == 1 and operation.before is None:
+            added[operation.names[0]] = [len(result) - 1]
+        if isinstance(operation, ModifyFunction):
+            name = operation.fun_name
+            modified.setdefault(name, []).append(len(result) - 1)
+            if name in added:
+                added[name].append(len(result) - 1)
+
+    return [operation for operation in result if operation is not None], report
+
+def _modify(operation: ModifyFunction, result: list, added: dict, modified: dict,
+            report: OptimizationReport) -> ModifyFunction | None:
+    '''
+    Fuse "operation" with the previous operations on its name. Returns the
+    operation to append, or None when it was merged into a previous one.
+    '''
+
+    name = operation.fun_name
+    if not operation.need_original:
+        for position in modified.pop(name, ()):
+            report.eliminated.append((result[position], f'"{name}" is replaced without original later'))
+            result[position] = None
+            if name in added:
+                added[name].remove(position)
+
+        positions = added.get(name)
+        if positions is not None and isinstance(result[positions[0]].tree, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            add = result[positions[0]]
+            fused = Add(add.names, operation.tree)
+            report.fused.append(((add, operation), fused))
+            result[positions[0]] = fused
+            return None
+        return operation
+
+    if name in modified:
+        position = modified[name][-1]
+        previous = result[position]
+        tree = inline_original(operation.tree, previous.tree)
+        if tree is not None:
+            fused = ModifyFunction(name, tree, operation.hoist_original, operation.inline_original)
+            report.fused.append(((previous, operation), fused))
+            result[position] = fused
+            return None
+    return operation
+
+def _touched(operation: Operation) -> frozenset[str]:
+    if isinstance(operation, Add) and operation.before is not None:
+        return operation.write_set() | {operation.before}
+    return operation.write_set()
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import pickle
+import struct
+import sys
+import tempfile
+
+from dataclasses import dataclass, field
+
+from ..core_module.package import find_modules
+from .operations import Operation
+from .module_parser import parse_delta_module
+
+# Bump whenever the pickled layout of the operations changes
+PACK_VERSION = 1
+
+_MAGIC = b'PYDOPACK'
+_HEADER = struct.Struct('>8sH16s')
+
+class InvalidDeltaPack(Exception):
+    '''The file is not a delta pack this library and interpreter can load'''
+
+class StaleDeltaPack(InvalidDeltaPack):
+    '''The sources of the delta pack changed since it was built'''
+
+@dataclass
+class PackedDelta:
+    '''DeltaDefinition stored in a pack, whose operations are unpickled when first read'''
+
+    name: str
+    target: str
+    lineno: int
+    write_set: frozenset[str]
+    blob: bytes = field(repr=False)
+    _operations: tuple[Operation, ...] | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def operations(self) -> tuple[Operation, ...]:
+        if self._operations is None:
+            self._operations = pickle.loads(self.blob)
+        return self._operations
+
+    def __getstate__(self):
+        return (self.name, self.target, self.lineno, self.write_set, self.blob)
+
+    def __setstate__(self, state):
+        self.name, self.target, self.lineno, self.write_set, self.blob = state
+        self._operations = None
+
+@dataclass
+class DeltaPack:
+    '''Parsed deltas of a delta package, by dotted module name'''
+
+    modules: dict[str, list[PackedDelta]]
+    # Module name -> (path relative to the package directory, sha256 of the source)
+    sources: dict[str, tuple[str, str]]
+
+    def deltas(self) -> list[PackedDelta]:
+        return [delta for deltas in self.modules.values() for delta in deltas]
+
+def build_pack(directory: str, pack_path: str) -> DeltaPack:
+    '''
+    Parse every delta module under "directory" and write them to "pack_path".
+
+    The pack starts with a header (magic, PACK_VERSION, interpreter cache tag)
+    followed by the pickled DeltaPack. The operations of each delta are pickled
+    separately, so loading a pack only reads the names, targets and write-sets.
+    Source paths are stored relative to "directory", so the pack can be loaded
+    against a copy of the sources.
+    '''
+
+    directory = os.path.abspath(directory)
+    modules = dict()
+    sources = dict()
+    for name, path in find_modules(directory).items():
+        with open(path, 'rb') as f:
+            source = f.read()
+        modules[name] = [
+            PackedDelta(delta.name, delta.target, delta.lineno, delta.write_set,
+                        pickle.dumps(delta.operations, protocol=pickle.HIGHEST_PROTOCOL))
+            for delta in parse_delta_module(source, path)
+        ]
+        sources[name] = (os.path.relpath(path, directory), hashlib.sha256(source).hexdigest())
+
+    pack = DeltaPack(modules, sources)
+    pack_dir = os.path.dirname(os.path.abspath(pack_path))
+    fd, tmp_path = tempfile.mkstemp(dir=pack_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_header())
+            pickle.dump(pack, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return pack
+
+def load_pack(pack_path: str, directory: str | None = None) -> DeltaPack:
+    '''
+    Load a delta pack written by build_pack.
+
+    When "directory" is given, every source of the pack is hashed again and
+    StaleDeltaPack is raised if one was changed or removed, or if a module was
+    added. Packs from another PACK_VERSION or interpreter raise InvalidDeltaPack.
+    '''
+
+    with open(pack_path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if header != _header():
+            raise InvalidDeltaPack(f'"{pack_path}" is not a delta pack for this version of pydopast and Python')
+        try:
+            pack = pickle.load(f)
+        except Exception as e:
+            raise InvalidDeltaPack(f'"{pack_path}" is corrupted') from e
+
+    if not isinstance(pack, DeltaPack):
+        raise InvalidDeltaPack(f'"{pack_path}" is corrupted')
+    if directory is not None:
+        _verify(pack, directory)
+    return pack
+
+def _header() -> bytes:
+    return _HEADER.pack(_MAGIC, PACK_VERSION, sys.implementation.cache_tag.encode())
+
+def _verify(pack: DeltaPack, directory: str):
+    added = find_modules(directory).keys() - pack.sources.keys()
+    if added:
+        raise StaleDeltaPack(f'Delta module "{min(added)}" was added since the pack was built')
+
+    for name, (relpath, digest) in pack.sources.items():
+        try:
+            with open(os.path.join(directory, relpath), 'rb') as f:
+                source = f.read()
+        except OSError as e:
+            raise StaleDeltaPack(f'Source of delta module "{name}" is missing') from e
+
+        if hashlib.sha256(source).hexdigest() != digest:
+            raise StaleDeltaPack(f'Delta module "{name}" changed since the pack was built')
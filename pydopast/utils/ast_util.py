@@ -1,4 +1,5 @@
 import ast
+import re
 
 def is_equal(ast1: ast.AST | list[ast.AST], ast2: ast.AST | list[ast.AST]):
     '''
@@ -14,7 +15,7 @@ def is_equal(ast1: ast.AST | list[ast.AST], ast2: ast.AST | list[ast.AST]):
     if not ast2:
         return False
     
-    if type(ast1) != type(ast2):
+    if type(ast1) != type(ast2) and not (isinstance(ast1, list) and isinstance(ast2, list)):
         return False
     
     if isinstance(ast1, ast.AST):
@@ -37,4 +38,308 @@ def is_equal(ast1: ast.AST | list[ast.AST], ast2: ast.AST | list[ast.AST]):
                 return False
         return True
 
-    return ast1 == ast2
\ No newline at end of file
+    return ast1 == ast2
+
+class DeferredBody(list):
+    '''
+    Statement list of a function whose source has not been parsed yet.
+
+    The statements are parsed from source[start:end] (the indented body lines, the
+    first one being line "first_lineno") the first time the list is used, and the
+    end position of the "owners" (the function and the classes it ends) is updated.
+    C-level consumers such as compile() read the list directly, so call materialize()
+    on a tree before compiling it.
+    '''
+
+    __slots__ = ('_source', '_start', '_end', '_first_lineno', 'owners')
+
+    def __init__(self, source: str, start: int, end: int, first_lineno: int, owners: list[ast.AST]):
+        super().__init__()
+        self._source = source
+        self._start = start
+        self._end = end
+        self._first_lineno = first_lineno
+        self.owners = owners
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._source is None
+
+    def _materialize(self):
+        # "if 1:" keeps the original indentation and column offsets
+        wrapper = ast.parse('if 1:\n' + self._source[self._start:self._end])
+        statements = wrapper.body[0].body
+        for node in statements:
+            ast.increment_lineno(node, self._first_lineno - 2)
+
+        list.extend(self, statements)
+        self._source = None
+        if statements:
+            for owner in self.owners:
+                owner.end_lineno = statements[-1].end_lineno
+                owner.end_col_offset = statements[-1].end_col_offset
+        self.owners = []
+
+    def __reduce_ex__(self, protocol):
+        if self._source is None:
+            return (list, (list(self),))
+        return (DeferredBody, (self._source, self._start, self._end, self._first_lineno, self.owners))
+
+    def __repr__(self):
+        if self._source is None:
+            return list.__repr__(self)
+        return f'DeferredBody(lines {self._first_lineno}-{self._source.count(chr(10), 0, self._end)})'
+
+def _materializing(method):
+    def wrapper(self, *args, **kwargs):
+        if self._source is not None:
+            self._materialize()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+for _name in ('__iter__', '__len__', '__getitem__', '__setitem__', '__delitem__', '__contains__',
+              '__reversed__', '__eq__', '__ne__', '__add__', '__iadd__', '__mul__', '__imul__',
+              'append', 'extend', 'insert', 'pop', 'remove', 'index', 'count', 'copy', 'clear',
+              'reverse', 'sort'):
+    setattr(DeferredBody, _name, _materializing(getattr(list, _name)))
+
+def materialize(node: ast.AST) -> ast.AST:
+    '''Parse every DeferredBody in the tree, so that it can be compiled'''
+
+    for _ in ast.walk(node):
+        pass
+    return node
+
+def shift_lines(node: ast.AST, shift: int):
+    '''
+    Move every node of the tree "shift" lines down, like ast.increment_lineno, but
+    without parsing a DeferredBody: its first line is moved instead, and its statements
+    get their lines when they are parsed.
+    '''
+
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        state = node.__dict__
+        if 'lineno' in state:
+            state['lineno'] += shift
+            if state.get('end_lineno') is not None:
+                state['end_lineno'] += shift
+
+        nodes, lists = _located_fields.get(node.__class__) or _find_located_fields(node.__class__)
+        for name in nodes:
+            value = state.get(name)
+            if value is not None:
+                stack.append(value)
+        for name in lists:
+            value = state.get(name)
+            if isinstance(value, DeferredBody) and not value.is_materialized:
+                value._first_lineno += shift
+            elif value:
+                # Dict.keys and arguments.kw_defaults hold None for missing items
+                stack.extend(item for item in value if item is not None)
+
+# Node type -> its fields holding located nodes, and lists of them (see shift_lines)
+_located_fields: dict[type, tuple[tuple[str, ...], tuple[str, ...]]] = dict()
+
+# Node types without location, only used as singletons (Load, Add, Eq, ...)
+_UNLOCATED = (ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop)
+
+def _find_located_fields(node_type: type) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    nodes = []
+    lists = []
+    for name in node_type._fields:
+        field_type = node_type._field_types[name]
+        is_list = getattr(field_type, '__origin__', None) is list
+        if is_list:
+            field_type = field_type.__args__[0]
+        if any(isinstance(t, type) and issubclass(t, ast.AST) and not issubclass(t, _UNLOCATED)
+               for t in getattr(field_type, '__args__', (field_type,))):
+            (lists if is_list else nodes).append(name)
+
+    fields = _located_fields[node_type] = (tuple(nodes), tuple(lists))
+    return fields
+
+# Nodes returned as is by clone(share_leaves=True): they are never modified in place
+# (Name is not one of them: rename_free and the inliner rename Name.id in place)
+_LEAVES = (ast.Constant,)
+
+# Node type -> copier, one table per value of share_leaves
+_copiers: tuple[dict[type, object], dict[type, object]] = (dict(), dict())
+
+def clone(node, share_leaves: bool = False):
+    '''
+    Independent copy of an AST, faster than copy.deepcopy.
+
+    Each node type gets a copier driven by its _fields: the fields and location
+    attributes of a node are copied without deepcopy's memo, and only the child
+    nodes and lists of nodes are cloned. Strings, numbers, constant values and
+    the context and operator singletons (Load, Add, ...) are shared. With
+    "share_leaves", Constant nodes are shared too. Nodes reachable
+    twice are cloned twice. A list of nodes is cloned into a new list.
+    '''
+
+    copiers = _copiers[share_leaves]
+    if isinstance(node, list):
+        return [_clone(item, copiers) for item in node]
+    return _clone(node, copiers)
+
+def _clone(node, copiers: dict):
+    copier = copiers.get(node.__class__)
+    if copier is None:
+        if not isinstance(node, ast.AST):
+            return node
+        copier = copiers[node.__class__] = _make_copier(node.__class__, copiers is _copiers[True])
+    return copier(node, copiers)
+
+def _make_copier(node_type: type, share_leaves: bool):
+    if not node_type._fields or (share_leaves and issubclass(node_type, _LEAVES)):
+        return lambda node, copiers: node
+
+    field_types = getattr(node_type, '_field_types', None)
+    if field_types is None:
+        # Field types are only known from Python 3.13, check every field
+        fields = _located_fields[node_type] = (node_type._fields, node_type._fields)
+        return fields
+
+    nodes = []
+    lists = []
+    for name in node_type._fields:
+        field_type = field_types.get(name, ast.AST)
+        if getattr(field_type, '__origin__', None) is list:
+            lists.append(name)
+        elif any(isinstance(t, type) and issubclass(t, ast.AST) for t in getattr(field_type, '__args__', (field_type,))):
+            nodes.append(name)
+
+    def copier(node, copiers):
+        state = node.__dict__.copy()
+        for name in nodes:
+            value = state.get(name)
+            if value is not None:
+                state[name] = _clone(value, copiers)
+        for name in lists:
+            value = state.get(name)
+            if value is not None:
+                state[name] = [_clone(item, copiers) for item in value]
+        new = node_type.__new__(node_type)
+        new.__dict__ = state
+        return new
+    return copier
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+def mentions(statements: list[ast.stmt], name: str) -> bool:
+    '''Whether "name" may appear in the statements, without parsing a DeferredBody'''
+
+    if isinstance(statements, DeferredBody) and not statements.is_materialized:
+        return re.search(rf'\b{re.escape(name)}\b', statements._source[statements._start:statements._end]) is not None
+    return any(isinstance(node, ast.Name) and node.id == name for statement in statements for node in ast.walk(statement))
+
+def rename_free(function: ast.AST, old: str, new: str) -> bool:
+    '''
+    Rename, in place, the reads of "old" in the body of "function" (a function,
+    lambda or comprehension) that are not bound inside it, i.e. that resolve to
+    the enclosing scope.
+
+    Follows Python scoping: names bound by a function, lambda or comprehension
+    (parameters, assignments, definitions, imports, global and nonlocal
+    declarations, ...) shadow "old" in it and its nested functions, names bound
+    by a class only in the class body. Returns whether a name was renamed.
+    '''
+
+    renamer = _FreeRenamer(old, new)
+    renamer.function(function)
+    return renamer.renamed
+
+def _arguments(args: ast.arguments) -> list[ast.arg]:
+    return args.posonlyargs + args.args + args.kwonlyargs + [arg for arg in (args.vararg, args.kwarg) if arg]
+
+def scope_nodes(nodes: list[ast.AST]):
+    '''
+    Nodes evaluated in the current scope. Nested scopes (functions, lambdas,
+    classes and comprehensions) are yielded, but only their parts evaluated in
+    the current scope (decorators, defaults, bases, first iterable) are visited.
+    '''
+
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            args = node.args
+            outer = list(args.defaults) + [default for default in args.kw_defaults if default]
+            if not isinstance(node, ast.Lambda):
+                outer += node.decorator_list + [arg.annotation for arg in _arguments(args) if arg.annotation]
+                outer += [node.returns] if node.returns else []
+        elif isinstance(node, ast.ClassDef):
+            outer = node.decorator_list + node.bases + node.keywords
+        elif isinstance(node, _COMPREHENSIONS):
+            outer = [node.generators[0].iter]
+        else:
+            outer = list(ast.iter_child_nodes(node))
+        stack.extend(reversed(outer))
+
+def _scope_parts(scope: ast.AST) -> list[ast.AST]:
+    if isinstance(scope, _COMPREHENSIONS):
+        parts = [scope.key, scope.value] if isinstance(scope, ast.DictComp) else [scope.elt]
+        for i, generator in enumerate(scope.generators):
+            parts += [generator.target, *generator.ifs] + ([generator.iter] if i else [])
+        return parts
+    if isinstance(scope, ast.Lambda):
+        return [scope.body]
+    return scope.body
+
+def binds(scope: ast.AST, name: str) -> bool:
+    '''Whether "name" is local to "scope" (a function, lambda, comprehension or class), or declared global or nonlocal'''
+
+    if isinstance(scope, _FUNCTIONS) and any(arg.arg == name for arg in _arguments(scope.args)):
+        return True
+
+    for node in scope_nodes(_scope_parts(scope)):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name == name:
+            return True
+        if isinstance(node, ast.Name) and node.id == name and not isinstance(node.ctx, ast.Load):
+            return True
+        if isinstance(node, (ast.Global, ast.Nonlocal)) and name in node.names:
+            return True
+        if isinstance(node, (ast.Import, ast.ImportFrom)) \
+                and any((alias.asname or alias.name.split('.')[0]) == name for alias in node.names):
+            return True
+        if isinstance(node, ast.ExceptHandler) and node.name == name:
+            return True
+        if isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name == name:
+            return True
+        if isinstance(node, ast.MatchMapping) and node.rest == name:
+            return True
+        if isinstance(node, _COMPREHENSIONS) and not isinstance(scope, ast.ClassDef) \
+                and any(isinstance(child, ast.NamedExpr) and child.target.id == name for child in ast.walk(node)):
+            # Assignment expressions in a comprehension bind in the enclosing function
+            return True
+    return False
+
+class _FreeRenamer:
+    def __init__(self, old: str, new: str):
+        self.old = old
+        self.new = new
+        self.renamed = False
+
+    def function(self, scope: ast.AST):
+        '''Scope of a function, lambda or comprehension, whose enclosing function scopes do not bind the name'''
+
+        if not binds(scope, self.old):
+            self.visit(_scope_parts(scope), rename=True)
+
+    def visit(self, nodes: list[ast.AST], rename: bool):
+        for node in scope_nodes(nodes):
+            if rename and isinstance(node, ast.Name) and node.id == self.old:
+                node.id = self.new
+                self.renamed = True
+            elif isinstance(node, (*_FUNCTIONS, *_COMPREHENSIONS)):
+                self.function(node)
+            elif isinstance(node, ast.ClassDef):
+                # Names bound in a class body are only seen by the class body, not by its methods
+                self.visit(node.body, rename=not binds(node, self.old))
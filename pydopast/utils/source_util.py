@@ -0,0 +1,113 @@
+import ast
+import inspect
+import linecache
+import os
+import tokenize
+
+class SourceIndex:
+    '''
+    Sources of the functions and classes of files, sliced by their first line.
+
+    Each file is read and parsed once into a map from the first line of every
+    definition (its first decorator included) to its last line, so the source
+    of a function is found from its co_firstlineno without tokenizing the file
+    again. A file is indexed again when its mtime or size changes. Sources not
+    backed by a file (linecache entries) are read from linecache every time.
+    '''
+
+    def __init__(self):
+        # filename -> (file stamp, lines, first line -> last line)
+        self._files: dict[str, tuple[tuple[int, int], list[str], dict[int, int]]] = dict()
+
+    def _index(self, filename: str) -> tuple[list[str], dict[int, int]]:
+        try:
+            stat = os.stat(filename)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return _build(linecache.getlines(filename))
+
+        known = self._files.get(filename)
+        if known is not None and known[0] == stamp:
+            return known[1], known[2]
+
+        try:
+            with tokenize.open(filename) as f:
+                lines = f.readlines()
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            return _build(linecache.getlines(filename))
+
+        lines, blocks = _build(lines)
+        self._files[filename] = (stamp, lines, blocks)
+        return lines, blocks
+
+    def source_at(self, filename: str, lineno: int) -> str:
+        '''Source of the definition starting at line "lineno" of a file, dedented so that it can be parsed on its own'''
+
+        lines, blocks = self._index(filename)
+        if not 0 < lineno <= len(lines):
+            raise OSError(f'Could not read line {lineno} of "{filename}"')
+
+        end = blocks.get(lineno)
+        if end is None:
+            return _dedent(inspect.getblock(lines[lineno - 1:]))
+        return _dedent(lines[lineno - 1:end])
+
+    def source(self, obj) -> str:
+        '''Source of a function (decorators included), dedented so that it can be parsed on its own'''
+
+        code = getattr(inspect.unwrap(obj), '__code__', None)
+        if code is None:
+            return _dedent(inspect.getsourcelines(obj)[0])
+        return self.source_at(code.co_filename, code.co_firstlineno)
+
+    def clear(self):
+        self._files.clear()
+
+def _build(lines: list[str]) -> tuple[list[str], dict[int, int]]:
+    blocks = dict()
+    try:
+        tree = ast.parse(''.join(lines))
+    except (SyntaxError, ValueError):
+        return lines, blocks
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [dec.lineno for dec in node.decorator_list])
+            # ast.walk yields outer definitions first
+            blocks.setdefault(start, node.end_lineno)
+    return lines, blocks
+
+_default_index = SourceIndex()
+
+def get_source(function) -> str:
+    '''Source of a function (decorators included), dedented so that it can be parsed on its own'''
+
+    return _default_index.source(function)
+
+def get_source_at(filename: str, lineno: int) -> str:
+    '''Source of the definition starting at line "lineno" of a file, dedented like get_source'''
+
+    return _default_index.source_at(filename, lineno)
+
+def dedent(source: str) -> str:
+    '''Remove the indentation of the first line of "source" from every line'''
+
+    return _dedent(source.splitlines(keepends=True))
+
+def _dedent(lines: list[str]) -> str:
+    if not lines:
+        return ''
+
+    # The exact whitespace of the first line, tabs included: a line indented
+    # differently is inside brackets or a string, where indentation is free
+    first = lines[0]
+    indent = first[:len(first) - len(first.lstrip(' \t'))]
+    src = []
+    for line in lines:
+        if line.startswith(indent):
+            src.append(line[len(indent):])
+        elif not line.strip():
+            src.append(line.lstrip(' \t'))
+        else:
+            src.append(line)
+    return ''.join(src)
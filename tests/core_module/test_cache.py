@@ -0,0 +1,55 @@
+import ast
+import os
+from unittest import mock
+
+from pydopast.core_module import ModuleAttribute, CoreModuleParser, ParseCache
+
+CORE = """
+import os
+a = 1
+def fun(p):
+    return p + a
+class MyClass(Base):
+    x = 2
+    def method(self):
+        return self.x
+"""
+
+class TestParseCache:
+    def test_cold_parse_equals_parser(self, tmp_path):
+        cache = ParseCache(str(tmp_path))
+        module_attribute = cache.parse(CORE)
+
+        expected = CoreModuleParser().parse(ast.parse(CORE))
+        assert expected == module_attribute
+        assert len(os.listdir(tmp_path)) == 1
+
+    def test_warm_parse_skips_parsing(self, tmp_path):
+        ParseCache(str(tmp_path)).parse(CORE)
+
+        cache = ParseCache(str(tmp_path))
+        with mock.patch.object(ast, 'parse', side_effect=AssertionError), \
+                mock.patch.object(CoreModuleParser, 'parse', side_effect=AssertionError):
+            module_attribute = cache.parse(CORE)
+
+        expected = CoreModuleParser().parse(ast.parse(CORE))
+        assert expected == module_attribute
+
+        class_id, class_attribute = module_attribute.attr_to_id['MyClass']
+        assert isinstance(module_attribute.body[class_id], ast.ClassDef)
+        assert class_attribute.attr_to_id == {'x': 0, 'method': 1}
+
+    def test_key_depends_on_source(self, tmp_path):
+        cache = ParseCache(str(tmp_path))
+        assert cache.key(CORE) == cache.key(CORE.encode())
+        assert cache.key(CORE) != cache.key(CORE + '\nb = 2')
+
+    def test_corrupted_entry_is_rebuilt(self, tmp_path):
+        cache = ParseCache(str(tmp_path))
+        with open(cache.path(cache.key(CORE)), 'wb') as f:
+            f.write(b'not a pickle')
+
+        module_attribute = cache.parse(CORE)
+        assert isinstance(module_attribute, ModuleAttribute)
+        assert module_attribute.attr_to_id['a'] == 1
+        assert isinstance(cache.load(cache.key(CORE)), ModuleAttribute)
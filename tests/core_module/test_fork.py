@@ -0,0 +1,176 @@
+import ast
+import pickle
+import pytest
+
+from pydopast.core_module import CoreModuleParser, ClassAttribute
+from pydopast.core_module.body import Body, _Root
+from pydopast.core_module.index import AttrIndex, MAX_FORK_DEPTH
+from pydopast.delta_module import Add, ModifyFunction, Remove
+
+CORE = '''
+import os
+a = 1
+def fun(p):
+    return p + a
+class MyClass(Base):
+    x = 2
+    def method(self):
+        return self.x
+'''
+
+def parse(code):
+    return ast.parse(code).body[0]
+
+class TestFork:
+    def test_fork_is_equal_and_shares_statements(self):
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        expected = CoreModuleParser().parse(ast.parse(CORE))
+        variant = core.fork()
+
+        assert variant == expected and core == expected
+        assert all(a is b for a, b in zip(core.body, variant.body))
+
+    def test_operations_do_not_leak_between_forks(self):
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        first = core.fork()
+        second = core.fork()
+
+        ModifyFunction('fun', parse('def fun(p): return p')).apply(first)
+        Remove('a').apply(second)
+        Add(['b'], parse('b = 2')).apply(second)
+
+        fun_id = core.attr_to_id['fun']
+        assert ast.unparse(core.body[fun_id]) == 'def fun(p):\n    return p + a'
+        assert ast.unparse(first.body[fun_id]) == 'def fun(p):\n    return p'
+        assert ast.unparse(second.body[fun_id]) == 'def fun(p):\n    return p + a'
+
+        assert 'a' in core.attr_to_id and 'a' in first.attr_to_id and 'a' not in second.attr_to_id
+        assert 'b' not in core.attr_to_id and second.body[second.attr_to_id['b']] is list(second.body)[-1]
+        assert len(core.body) == len(first.body) == len(second.body)
+        assert core.attr_to_id['a'] not in second.body
+        assert core == CoreModuleParser().parse(ast.parse(CORE))
+
+    def test_fork_of_fork(self):
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        child = core.fork()
+        Remove('a').apply(child)
+        grandchild = child.fork()
+        Add(['a'], parse('a = 3')).apply(grandchild)
+
+        assert 'a' not in child.attr_to_id
+        assert grandchild.attr_to_id['a'] == len(core.body)
+        assert list(grandchild.attr_to_id) == ['os', 'fun', 'MyClass', 'a']
+        assert len(grandchild.attr_to_id) == 4 and len(child.attr_to_id) == 3
+
+    def test_class_attribute_is_copied_on_access(self):
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        _, core_class = core.attr_to_id['MyClass']
+        core_class.attr_to_id
+        variant = core.fork()
+
+        _, variant_class = variant.attr_to_id['MyClass']
+        assert variant_class is not core_class
+        assert variant.attr_to_id['MyClass'][1] is variant_class
+
+        del variant_class.attr_to_id['x']
+        assert core.attr_to_id['MyClass'][1].attr_to_id == {'x': 0, 'method': 1}
+        assert variant_class.attr_to_id == {'method': 1}
+
+    def test_lazy_class_attribute_fork(self):
+        class_attr = ClassAttribute(parse('class A:\n    x = 1'))
+        forked = class_attr.fork()
+        assert not forked.is_built and not class_attr.is_built
+        assert forked.attr_to_id == {'x': 0}
+
+    def test_long_fork_chains_are_flattened(self):
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        variant = core
+        for i in range(3 * MAX_FORK_DEPTH):
+            variant = variant.fork()
+            Add([f'v{i}'], parse(f'v{i} = {i}')).apply(variant)
+
+        assert variant.body._base.depth <= MAX_FORK_DEPTH
+        assert len(variant.attr_to_id._chain()) <= MAX_FORK_DEPTH + 1
+        assert len(variant.body) == len(core.body) + 3 * MAX_FORK_DEPTH
+        assert variant.attr_to_id[f'v{3 * MAX_FORK_DEPTH - 1}'] == len(variant.body) - 1
+
+    def test_pickled_fork_is_flat(self):
+        variant = CoreModuleParser().parse(ast.parse(CORE)).fork()
+        Remove('a').apply(variant)
+
+        loaded = pickle.loads(pickle.dumps(variant))
+        assert isinstance(loaded.attr_to_id, AttrIndex) and loaded.attr_to_id._parent is None
+        assert loaded == variant
+
+class TestBody:
+    def test_handles_are_stable(self):
+        body = Body(['a', 'b', 'c'])
+        d = body.append('d')
+        x = body.insert_before(1, 'x')
+        y = body.insert_after(1, 'y')
+        z = body.insert_after(x, 'z')
+        del body[0]
+
+        assert list(body) == ['x', 'z', 'b', 'y', 'c', 'd']
+        assert body.handles() == [x, z, 1, y, 2, d]
+        assert body[1] == 'b' and body[d] == 'd' and len(body) == 6
+        assert 0 not in body
+
+        with pytest.raises(KeyError):
+            body[0]
+        with pytest.raises(KeyError):
+            body.insert_after(0, 'w')
+
+    def test_parsed_body_is_not_copied(self):
+        tree = ast.parse(CORE)
+        core = CoreModuleParser().parse(tree)
+        class_attr = core.attr_to_id['MyClass'][1]
+
+        assert core.body._base.statements is tree.body
+        assert class_attr.body._base.statements is tree.body[-1].body
+        assert list(core.fork().body) == tree.body
+
+    def test_insert_before_first_and_deleted_neighbour(self):
+        body = Body(['a', 'b'])
+        head = body.insert_before(0, 'h')
+        del body[0]
+        body.insert_before(1, 'm')
+        body.insert_before(head, 'g')
+
+        assert list(body) == ['g', 'h', 'm', 'b']
+
+    def test_many_changes_are_compacted(self):
+        body = Body(range(10))
+        handles = [body.append(i) for i in range(10, 200)]
+        for handle in handles[::2]:
+            del body[handle]
+        for handle in range(10):
+            body[handle] = -handle
+
+        # Folded into a new root instead of piling up anchored handles and deleted ones
+        assert isinstance(body._base, _Root) and len(body._base.order) > 10
+        assert body._structural <= len(body._base.order)
+        assert list(body) == [-i for i in range(10)] + list(range(11, 200, 2))
+        assert body[handles[1]] == 11
+
+    def test_structural_changes_stay_private(self):
+        body = Body([1, 2, 3])
+        forked = body.fork()
+        forked.insert_before(0, 0)
+        body[2] = 4
+        body.insert_after(1, 5)
+        forked_twice = forked.fork()
+        del forked_twice[1]
+
+        assert forked == [0, 1, 2, 3]
+        assert body == [1, 2, 5, 4]
+        assert forked_twice == [0, 1, 3]
+
+    def test_pickle_keeps_handles(self):
+        body = Body(['a', 'b'])
+        x = body.insert_before(1, 'x')
+        del body[0]
+
+        loaded = pickle.loads(pickle.dumps(body))
+        assert loaded.handles() == [x, 1]
+        assert loaded.append('c') == body.append('c')
@@ -0,0 +1,114 @@
+import ast
+import pickle
+
+from pydopast.core_module import CoreModuleParser, parse_header_only
+from pydopast.delta_module import ModifyFunction
+from pydopast.utils.ast_util import DeferredBody, materialize
+
+CORE = '''
+import os
+
+a = 1
+
+@decorator(
+    "x:",
+)
+def fun(p,
+        q=(1, 2)):
+    """Docstring
+    def not_a_function():
+    """
+    if p:
+        return q  # comment:
+    else:
+        return a
+
+async def coroutine(): return 1
+
+class MyClass(Base):
+    x = 2
+
+    def method(self):
+        return self.x
+
+    class Inner:
+        def inner(self):
+            pass
+
+def last(*args, **kwargs):
+    return [
+        arg
+        for arg in args
+    ]
+'''
+
+def deferred_bodies(module_attrs):
+    bodies = []
+    for node in module_attrs.body:
+        for child in [node] + (node.body if isinstance(node, ast.ClassDef) else []):
+            if isinstance(getattr(child, 'body', None), DeferredBody):
+                bodies.append(child.body)
+    return bodies
+
+class TestParseHeaderOnly:
+    def test_index_equals_full_parse(self):
+        module_attrs = parse_header_only(CORE)
+        expected = CoreModuleParser().parse(ast.parse(CORE))
+
+        assert all(not body.is_materialized for body in deferred_bodies(module_attrs))
+        assert module_attrs.attr_to_id == expected.attr_to_id
+
+    def test_materialized_tree_equals_full_parse(self):
+        module_attrs = parse_header_only(CORE)
+        expected = ast.parse(CORE)
+
+        assert ast.dump(module_attrs.to_module(), include_attributes=True) \
+            == ast.dump(expected, include_attributes=True)
+        assert module_attrs == CoreModuleParser().parse(expected)
+
+    def test_body_is_parsed_on_first_use(self):
+        module_attrs = parse_header_only(CORE)
+        fun = module_attrs.body[module_attrs.attr_to_id['fun']]
+        assert not fun.body.is_materialized
+
+        assert isinstance(fun.body[1], ast.If)
+        assert fun.body.is_materialized
+        assert fun.body[1].lineno == 14
+
+        # Other functions are left alone
+        last = module_attrs.body[module_attrs.attr_to_id['last']]
+        assert not last.body.is_materialized
+
+    def test_class_members_are_deferred(self):
+        module_attrs = parse_header_only(CORE)
+        class_id, class_attribute = module_attrs.attr_to_id['MyClass']
+
+        assert class_attribute.attr_to_id == {'x': 0, 'method': 1}
+        method = module_attrs.body[class_id].body[class_attribute.attr_to_id['method']]
+        assert isinstance(method.body, DeferredBody) and not method.body.is_materialized
+
+    def test_modify_without_original_keeps_bodies_deferred(self):
+        module_attrs = parse_header_only(CORE)
+        ModifyFunction('fun', ast.parse('def fun(p): return p').body[0]).apply(module_attrs)
+
+        assert all(not body.is_materialized for body in deferred_bodies(module_attrs))
+
+    def test_pickle_keeps_bodies_deferred(self):
+        module_attrs = pickle.loads(pickle.dumps(parse_header_only(CORE)))
+
+        bodies = deferred_bodies(module_attrs)
+        assert bodies and all(not body.is_materialized for body in bodies)
+        assert module_attrs == CoreModuleParser().parse(ast.parse(CORE))
+
+    def test_compile_materialized_module(self):
+        namespace = dict()
+        module = materialize(parse_header_only('def f(x):\n    return x * 2\n').to_module())
+        exec(compile(module, '<core>', 'exec'), namespace)
+        assert namespace['f'](3) == 6
+
+    def test_unsupported_layout_falls_back_to_full_parse(self):
+        code = 'def f(x):\n    return f"{\n    x}"\n'
+        module_attrs = parse_header_only(code)
+
+        assert not isinstance(module_attrs.body[0].body, DeferredBody)
+        assert module_attrs == CoreModuleParser().parse(ast.parse(code))
@@ -0,0 +1,131 @@
+import ast
+from unittest import mock
+
+from pydopast.core_module import ModuleAttribute, CoreModuleParser, reparse, parse_header_only
+from pydopast.delta_module import ModifyFunction, Remove
+from pydopast.utils.ast_util import DeferredBody
+
+
+CORE = """
+import os
+a = 1
+
+def fun(p):
+    return p + a
+
+@dec
+class MyClass(Base):
+    x = 2
+    def method(self):
+        return self.x
+
+b = 2; c = 3
+
+def last():
+    pass
+"""
+
+RICH = """
+def rich(a, /, b: int = 2, *args, c, **kwargs) -> dict:
+    global counter
+    x = {1: a, **kwargs}
+    match x:
+        case {1: [y, *_]} if y:
+            return f"{y!r:>10}"
+    return [i async for i in b] if a else None
+"""
+
+def parse(code: str) -> ModuleAttribute:
+    return CoreModuleParser().parse(ast.parse(code))
+
+def assert_same_module(expected: ModuleAttribute, actual: ModuleAttribute):
+    assert expected == actual
+    for expected_node, node in zip(expected.body, actual.body):
+        assert ast.dump(expected_node, include_attributes=True) == ast.dump(node, include_attributes=True)
+
+
+class TestReparse:
+    def test_edit_function_body(self):
+        new_code = CORE.replace('return p + a', 'p += 1\n    return p + a')
+
+        previous = parse(CORE)
+        class_attribute = previous.attr_to_id['MyClass'][1]
+        module_attribute = reparse(previous, CORE, new_code)
+
+        assert module_attribute is previous
+        assert_same_module(parse(new_code), module_attribute)
+        assert module_attribute.attr_to_id['MyClass'][1] is class_attribute
+
+    def test_only_edited_statements_are_parsed(self):
+        new_code = CORE.replace('return p + a', 'return p - a')
+        previous = parse(CORE)
+
+        with mock.patch.object(ast, 'parse', wraps=ast.parse) as parse_mock:
+            reparse(previous, CORE, new_code)
+
+        assert parse_mock.call_args.args[0].strip() == 'def fun(p):\n    return p - a'
+
+    def test_insert_and_remove_statements(self):
+        new_code = CORE.replace('a = 1\n', 'a = 1\nnew_var = 2\ndef new_fun(): pass\n')
+        assert_same_module(parse(new_code), reparse(parse(CORE), CORE, new_code))
+
+        new_code = CORE.replace('b = 2; c = 3\n', '')
+        assert_same_module(parse(new_code), reparse(parse(CORE), CORE, new_code))
+
+    def test_redefinition_is_hidden(self):
+        new_code = CORE.replace('def last():', 'def fun():')
+        module_attribute = reparse(parse(CORE), CORE, new_code)
+
+        assert module_attribute.attr_to_id['fun'] == -1
+        assert 'last' not in module_attribute.attr_to_id
+        assert_same_module(parse(new_code), module_attribute)
+
+    def test_removing_redefinition(self):
+        code = CORE + 'a = 5\n'
+        new_code = CORE
+
+        assert_same_module(parse(new_code), reparse(parse(code), code, new_code))
+
+    def test_edit_shared_line(self):
+        new_code = CORE.replace('b = 2; c = 3', 'b = 2; d = 3')
+        module_attribute = reparse(parse(CORE), CORE, new_code)
+
+        assert 'c' not in module_attribute.attr_to_id
+        assert_same_module(parse(new_code), module_attribute)
+
+    def test_add_decorator(self):
+        new_code = CORE.replace('def last():', '@cache\ndef last():')
+        assert_same_module(parse(new_code), reparse(parse(CORE), CORE, new_code))
+
+    def test_unchanged_source(self):
+        previous = parse(CORE)
+        assert reparse(previous, CORE, CORE) is previous
+        assert_same_module(parse(CORE), previous)
+
+    def test_edit_opening_string(self):
+        new_code = CORE.replace('a = 1', 'a = """')  + '"""\n'
+        assert_same_module(parse(new_code), reparse(parse(CORE), CORE, new_code))
+
+    def test_shifted_lines_match_full_parse(self):
+        code = CORE + RICH
+        new_code = code.replace('a = 1\n', 'a = 1\n\n\n')
+
+        assert_same_module(parse(new_code), reparse(parse(code), code, new_code))
+
+    def test_deferred_bodies_are_not_parsed(self):
+        new_code = CORE.replace('a = 1\n', 'a = 1\nz = 0\n')
+        module_attribute = reparse(parse_header_only(CORE), CORE, new_code)
+
+        last = module_attribute.body[module_attribute.attr_to_id['last']]
+        assert isinstance(last.body, DeferredBody) and not last.body.is_materialized
+        assert ast.dump(module_attribute.to_module(), include_attributes=True) \
+            == ast.dump(ast.parse(new_code), include_attributes=True)
+
+    def test_modified_module_is_parsed_again(self):
+        new_code = CORE.replace('a = 1\n', 'a = 1\nz = 0\n')
+
+        # Replacing or removing the last statement keeps the handles 0..n-1
+        for operation in (ModifyFunction('last', ast.parse('def last(): return 1').body[0]), Remove('last')):
+            previous = parse(CORE)
+            operation.apply(previous)
+            assert_same_module(parse(new_code), reparse(previous, CORE, new_code))
@@ -0,0 +1,61 @@
+import ast
+import pickle
+import pytest
+
+from pydopast.core_module import ModuleAttribute, CoreModuleParser, ClassAttribute
+from pydopast.core_module.index import AttrIndex
+
+
+class TestAttrIndex:
+    def test_behaves_like_dict(self):
+        class_attr = ClassAttribute()
+        index = AttrIndex()
+        index['a'] = 0
+        index['b'] = -1
+        index['C'] = (2, class_attr)
+
+        assert index == {'a': 0, 'b': -1, 'C': (2, class_attr)}
+        assert list(index) == ['a', 'b', 'C']
+        assert index['C'][1] is class_attr
+        assert 'a' in index and 'd' not in index
+        assert index.get('d') is None
+
+        with pytest.raises(KeyError):
+            index['d']
+
+    def test_overwrite_and_delete(self):
+        index = AttrIndex({'a': 0, 'C': (1, ClassAttribute())})
+        index['C'] = -1
+        assert index['C'] == -1
+
+        del index['a']
+        index['d'] = 5
+        assert index == {'C': -1, 'd': 5}
+        assert len(index._classes) == 0
+
+    def test_slotted_attributes(self):
+        module_attribute = CoreModuleParser().parse(ast.parse('class A: pass'))
+        assert not hasattr(module_attribute, '__dict__')
+        assert not hasattr(module_attribute.attr_to_id['A'][1], '__dict__')
+        assert not hasattr(module_attribute.attr_to_id, '__dict__')
+
+    def test_pickle_keeps_class_attribute_lazy(self):
+        code = 'a = 1\nclass A:\n    x = 1\n'
+        module_attribute = CoreModuleParser().parse(ast.parse(code))
+
+        loaded: ModuleAttribute = pickle.loads(pickle.dumps(module_attribute))
+        assert not module_attribute.attr_to_id['A'][1].is_built
+        assert not loaded.attr_to_id['A'][1].is_built
+
+        assert loaded == module_attribute
+        assert loaded.attr_to_id['A'][1].attr_to_id == {'x': 0}
+
+    def test_occurrences_survive_pickle_and_fork(self):
+        module_attribute = CoreModuleParser().parse(ast.parse('a = 1\nimport a'))
+        occurrences = module_attribute.occurrences('a')
+        assert len(occurrences) == 2
+
+        loaded = pickle.loads(pickle.dumps(module_attribute))
+        assert loaded.attr_to_id['a'] == -1
+        assert loaded.occurrences('a') == occurrences
+        assert module_attribute.fork().occurrences('a') == occurrences
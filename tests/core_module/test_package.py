@@ -0,0 +1,56 @@
+import ast
+import pytest
+
+from pydopast.core_module import CoreModuleParser, parse_package, find_modules, PackageParseError
+
+def write(path, code):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(code)
+
+@pytest.fixture
+def core_package(tmp_path):
+    root = tmp_path / 'core'
+    write(root / '__init__.py', 'VERSION = 1\n')
+    write(root / 'b.py', 'def fun(): pass\n')
+    write(root / 'a.py', 'class A:\n    x = 1\n')
+    write(root / 'sub' / '__init__.py', '')
+    write(root / 'sub' / 'c.py', 'c = 3\n')
+    write(root / '__pycache__' / 'ignored.py', 'ignored = 1\n')
+    return root
+
+class TestParsePackage:
+    def test_find_modules(self, core_package):
+        assert list(find_modules(str(core_package)).keys()) == [
+            'core', 'core.a', 'core.b', 'core.sub', 'core.sub.c'
+        ]
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_parse_package(self, core_package, max_workers):
+        modules = parse_package(str(core_package), max_workers=max_workers)
+
+        assert list(modules.keys()) == ['core', 'core.a', 'core.b', 'core.sub', 'core.sub.c']
+        for name, path in find_modules(str(core_package)).items():
+            with open(path) as f:
+                assert CoreModuleParser().parse(ast.parse(f.read())) == modules[name]
+        assert modules['core.a'].attr_to_id['A'][1].attr_to_id == {'x': 0}
+
+    def test_parse_package_with_cache(self, core_package, tmp_path):
+        cache_dir = tmp_path / 'cache'
+        first = parse_package(str(core_package), max_workers=1, cache_dir=str(cache_dir))
+        second = parse_package(str(core_package), max_workers=1, cache_dir=str(cache_dir))
+
+        assert len(list(cache_dir.iterdir())) == 5
+        assert first == second
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_errors_are_reported_per_file(self, core_package, max_workers):
+        write(core_package / 'broken.py', 'def broken(:\n')
+        write(core_package / 'sub' / 'broken2.py', 'x = (\n')
+
+        with pytest.raises(PackageParseError) as error:
+            parse_package(str(core_package), max_workers=max_workers)
+
+        assert list(error.value.errors.keys()) == ['core.broken', 'core.sub.broken2']
+        assert isinstance(error.value.errors['core.broken'], SyntaxError)
+        assert 'core.b' in error.value.modules
+        assert 'core.broken' not in error.value.modules
@@ -1,6 +1,6 @@
 import ast
 
-from pydopast.core_module import ModuleAttribute, CoreModuleParser, ClassAttribute
+from pydopast.core_module import ModuleAttribute, CoreModuleParser, ClassAttribute, ClassParser, Binding, Occurrence
 
 
 def parse(code: str) -> ModuleAttribute:
@@ -64,6 +64,7 @@ class TestVariableAssignment:
         module_attribute: ModuleAttribute = parse(code)
         assert module_attribute.attr_to_id['a'] == -1
         assert module_attribute.attr_to_id['b'] == -1
+        assert module_attribute.occurrences('b') == (Occurrence(0, Binding.ASSIGN, False),)
 
     def test_unpacking_cannot_be_modified(self):
         """hide unpacking attribute id (set it to -1)"""
@@ -342,4 +343,85 @@ from .. import fun3 as alias1
         assert module_attribute.attr_to_id['alias1'] == -1
 
         assert not is_contain(module_attribute.attr_to_id, 'abc')
-        assert not is_contain(module_attribute.attr_to_id, 'fun3')
\ No newline at end of file
+        assert not is_contain(module_attribute.attr_to_id, 'fun3')
+
+class TestLazyClassAttribute:
+    def test_class_index_is_built_on_first_access(self):
+        code = """
+class A:
+    a = 1
+    def m(self): pass
+"""
+        module_attribute: ModuleAttribute = parse(code)
+        class_attribute: ClassAttribute = module_attribute.attr_to_id['A'][1]
+        assert not class_attribute.is_built
+
+        assert class_attribute.attr_to_id == {'a': 0, 'm': 1}
+        assert class_attribute.is_built
+
+        attr_to_id = class_attribute.attr_to_id
+        assert class_attribute.attr_to_id is attr_to_id
+
+    def test_body_is_built_separately(self):
+        module_attribute: ModuleAttribute = parse("class A:\n    a = 1\n    def m(self): pass")
+        class_ast = module_attribute.body[0]
+        class_attribute: ClassAttribute = module_attribute.attr_to_id['A'][1]
+        class_attribute.attr_to_id
+
+        assert class_attribute._class_ast is class_ast
+        assert list(class_attribute.body) == class_ast.body
+        assert class_attribute._class_ast is None
+        assert class_attribute.fork() == class_attribute
+
+    def test_lazy_and_eager_class_attributes_are_equal(self):
+        code = """
+class A:
+    a = b = 1
+    def m(self): pass
+"""
+        class_ast = ast.parse(code).body[0]
+        assert ClassAttribute(class_ast) == ClassParser().parse(class_ast)
+
+class TestOccurrences:
+    def test_single_definition(self):
+        module_attribute: ModuleAttribute = parse("a = 1\ndef f(): pass\nclass A: pass")
+
+        assert module_attribute.occurrences('a') == (Occurrence(0, Binding.ASSIGN, True),)
+        assert module_attribute.occurrences('f') == (Occurrence(1, Binding.FUNCTION, True),)
+        assert module_attribute.occurrences('A') == (Occurrence(2, Binding.CLASS, True),)
+
+    def test_every_binding_is_recorded(self):
+        code = """
+import os
+def fun1(a):
+    pass
+fun1 = 2
+if os.name:
+    def fun2(): pass
+else:
+    fun2 = None
+a, b = 1, 2
+del a
+"""
+        module_attribute: ModuleAttribute = parse(code)
+
+        assert module_attribute.attr_to_id['fun1'] == -1
+        assert module_attribute.occurrences('fun1') == (
+            Occurrence(1, Binding.FUNCTION, True), Occurrence(2, Binding.ASSIGN, True)
+        )
+        assert module_attribute.occurrences('fun2') == (
+            Occurrence(3, Binding.FUNCTION, False), Occurrence(3, Binding.ASSIGN, False)
+        )
+        assert module_attribute.occurrences('os') == (Occurrence(0, Binding.IMPORT, False),)
+        assert module_attribute.occurrences('a') == (
+            Occurrence(4, Binding.TARGET, False), Occurrence(5, Binding.DELETE, False)
+        )
+
+    def test_class_body_occurrences(self):
+        class_ast = ast.parse("class A:\n    x = 1\n    def x(self): pass").body[0]
+        class_attribute = ClassParser().parse(class_ast)
+
+        assert class_attribute.attr_to_id['x'] == -1
+        assert class_attribute.occurrences('x') == (
+            Occurrence(0, Binding.ASSIGN, True), Occurrence(1, Binding.FUNCTION, True)
+        )
@@ -0,0 +1,82 @@
+import ast
+import pytest
+
+from pydopast.core_module import CoreModuleParser
+from pydopast.core_module.parsers import DeltaException
+from pydopast.delta_module import Add, ModifyClass, ModifyFunction, Remove
+
+CORE = '''
+a = 1
+def fun(p):
+    return p + a
+class MyClass:
+    x = 2
+'''
+
+def parse(code):
+    return ast.parse(code).body[0]
+
+def header(code):
+    tree = parse(code)
+    tree.body = []
+    return tree
+
+def source(core):
+    return ast.unparse(core.to_module())
+
+FEATURES = [
+    [Add(['b'], parse('b = 2')), ModifyFunction('fun', parse('def fun(p): return original(p) * b'))],
+    [Remove('a'), Add(['a'], parse('a = 3'), before='fun')],
+    [ModifyClass('MyClass', header('class MyClass: pass'), [Remove('x'), Add(['y'], parse('y = 1'))])],
+    [ModifyFunction('fun', parse('def fun(p): return original(p) - 1'), hoist_original=True)],
+]
+
+class TestSavepoint:
+    def test_rollback(self):
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        expected = source(core)
+        assert core.savepoint() == 1
+        for operation in FEATURES[0] + FEATURES[2]:
+            operation.apply(core)
+        core.rollback()
+
+        assert source(core) == expected
+        assert set(core.attr_to_id) == {'a', 'fun', 'MyClass'}
+        assert 'x' in core.attr_to_id['MyClass'][1].attr_to_id
+
+    def test_commit_keeps_changes(self):
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        core.savepoint()
+        core.savepoint()
+        Remove('a').apply(core)
+        core.commit()
+        core.rollback()
+        assert 'a' in core.attr_to_id
+
+        with pytest.raises(DeltaException):
+            core.rollback()
+
+    def test_depth_first_search(self):
+        def variant(selected):
+            core = CoreModuleParser().parse(ast.parse(CORE))
+            for feature in selected:
+                for operation in feature:
+                    operation.apply(core)
+            return source(core)
+
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        seen = dict()
+        def search(selected, remaining):
+            seen[tuple(map(id, selected))] = source(core)
+            for i, feature in enumerate(remaining):
+                core.savepoint()
+                for operation in feature:
+                    operation.apply(core)
+                search(selected + [feature], remaining[i + 1:])
+                core.rollback()
+
+        search([], FEATURES)
+        assert len(seen) == 2 ** len(FEATURES)
+        for selected, result in seen.items():
+            assert result == variant([feature for feature in FEATURES if id(feature) in selected])
+        assert source(core) == variant([])
@@ -0,0 +1,70 @@
+import ast
+import copy
+
+from unittest import mock
+
+from ..util_test import parse_delta as parse_delta_uncached
+from pydopast.core_module import CoreModuleParser
+from pydopast.delta_module import Delta, DeltaCache, DeltaParser, parse_delta
+
+def delta1(variant: Delta):
+    a = 1
+    variant.remove('b')
+
+def delta2(variant: Delta):
+    import os
+
+def delta3(variant: Delta):
+    @variant.modify
+    def f(x):
+        return original(x) + 1
+
+class TestDeltaCache:
+    def test_same_operations_as_parser(self):
+        cache = DeltaCache()
+        assert list(cache.parse(delta1)) == parse_delta_uncached(delta1)
+        assert isinstance(cache.parse(delta1), tuple)
+
+    def test_hit_skips_parsing(self):
+        cache = DeltaCache()
+        first = cache.parse(delta1)
+
+        with mock.patch.object(DeltaParser, 'parse_delta', side_effect=AssertionError):
+            assert cache.parse(delta1) is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_changed_source_is_parsed_again(self):
+        cache = DeltaCache()
+        first = cache.parse(delta1)
+
+        # The file changed on disk
+        cache._digests[delta1.__code__] = (None, b'')
+        with mock.patch('pydopast.delta_module.delta.get_source', return_value='def delta1(v):\n    b = 2\n'):
+            second = cache.parse(delta1)
+        assert second is not first and len(cache) == 2
+        assert second == (DeltaParser().parse_delta('def delta1(v):\n    b = 2\n')[0],)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = DeltaCache(maxsize=1)
+        cache.parse(delta1)
+        cache.parse(delta2)
+        cache.parse(delta1)
+
+        assert len(cache) == 1 and cache.misses == 3
+
+    def test_default_cache(self):
+        assert parse_delta(delta2) is parse_delta(delta2)
+
+    def test_shared_operations_are_not_modified_when_applied(self):
+        cache = DeltaCache()
+        operations = cache.parse(delta3)
+        states = [(ast.dump(operation.tree), copy.copy(vars(operation))) for operation in operations]
+
+        core = CoreModuleParser().parse(ast.parse('def f(x):\n    return x'))
+        for _ in range(2):
+            variant = core.fork()
+            for operation in operations:
+                operation.apply(variant)
+                operation.apply(variant)
+
+        assert [(ast.dump(operation.tree), vars(operation)) for operation in operations] == states
@@ -0,0 +1,50 @@
+import ast
+import pytest
+from unittest import mock
+
+from ..util_test import parse_delta
+from pydopast.core_module import CoreModuleParser
+from pydopast.delta_module import Delta, DeltaParser, LazyDeltaOperation, Target, delta_target
+
+@delta_target('core')
+def delta1(variant: Delta):
+    a = 1
+
+    @variant.modify
+    def fun(p):
+        return p
+
+    variant.remove('b')
+
+class TestLazyDeltaOperation:
+    def test_registration_does_not_parse(self):
+        with mock.patch.object(DeltaParser, 'parse_delta', side_effect=AssertionError):
+            @delta_target('core')
+            def delta2(variant: Delta):
+                b = 2
+
+        lazy = delta2.lazy_delta
+        assert lazy == LazyDeltaOperation(__file__, delta2.__code__.co_firstlineno, Target.FUNCTION)
+        assert not lazy.is_parsed
+
+    def test_operations_are_parsed_once(self):
+        lazy = LazyDeltaOperation.of(delta1)
+        operations = lazy.operations
+
+        assert lazy.is_parsed
+        assert list(operations) == parse_delta(delta1)
+        assert lazy.operations is operations
+
+    def test_apply(self):
+        core = CoreModuleParser().parse(ast.parse('b = 0\ndef fun(p): return p + 1'))
+        expected = CoreModuleParser().parse(ast.parse('b = 0\ndef fun(p): return p + 1'))
+        for operation in parse_delta(delta1):
+            operation.apply(expected)
+
+        delta1.lazy_delta.apply(core)
+        assert core == expected
+
+    def test_missing_source(self):
+        lazy = LazyDeltaOperation('<missing>', 3)
+        with pytest.raises(OSError):
+            lazy.operations
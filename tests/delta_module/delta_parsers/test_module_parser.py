@@ -0,0 +1,69 @@
+import ast
+import pytest
+from unittest import mock
+
+from ..util_test import parse_delta
+from pydopast.delta_module import (Delta, DeltaParser, DeltaParseError, delta_target, parse_delta_file, parse_delta_module)
+
+DELTA_MODULE = '''
+import pydopast
+from pydopast.delta_module import delta_target as target
+
+def helper(variant):
+    a = 1
+
+@target('core')
+def delta1(variant):
+    a = 1
+    variant.remove('b')
+
+@pydopast.delta_module.delta_target(core_module)
+def delta2(variant):
+    @variant.modify
+    def fun(p):
+        return p
+'''
+
+@delta_target('core')
+def delta3(variant: Delta):
+    x, y = 1, 2
+
+    @variant.modify
+    class A:
+        def m(self): pass
+
+class TestParseDeltaModule:
+    def test_finds_decorated_functions(self):
+        deltas = parse_delta_module(DELTA_MODULE)
+
+        assert [(d.name, d.target, d.lineno) for d in deltas] == [('delta1', 'core', 9), ('delta2', 'core_module', 14)]
+        assert list(deltas[0].operations) == DeltaParser().parse_delta(
+            "def delta1(variant):\n    a = 1\n    variant.remove('b')"
+        )
+        assert ast.unparse(deltas[1].operations[0].tree) == 'def fun(p):\n    return p'
+        assert deltas[1].operations[0].tree.lineno == 16
+
+    def test_parses_module_once(self):
+        with open(__file__) as f:
+            source = f.read()
+
+        parse = ast.parse
+        with mock.patch.object(ast, 'parse', side_effect=parse) as mocked:
+            deltas = parse_delta_module(source, __file__)
+        assert mocked.call_count == 1
+
+        delta = next(d for d in deltas if d.name == 'delta3')
+        assert list(delta.operations) == parse_delta(delta3)
+
+    def test_error_location(self):
+        source = DELTA_MODULE + '\n@target("core")\ndef broken(variant):\n    a = 1\n    print(a)\n'
+        with pytest.raises(DeltaParseError) as error:
+            parse_delta_module(source, 'deltas.py')
+
+        assert error.value.lineno == 22 and error.value.delta == 'broken'
+        assert str(error.value).startswith('deltas.py:22: in delta "broken"')
+
+    def test_parse_file(self, tmp_path):
+        path = tmp_path / 'deltas.py'
+        path.write_text(DELTA_MODULE)
+        assert [d.name for d in parse_delta_file(str(path))] == ['delta1', 'delta2']
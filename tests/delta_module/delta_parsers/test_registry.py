@@ -0,0 +1,69 @@
+import sys
+from unittest import mock
+
+from pydopast.delta_module import Delta, DeltaParser, DeltaRegistry, default_registry, delta_target
+
+registry = DeltaRegistry()
+
+@delta_target('core', registry)
+def delta1(variant: Delta):
+    a = 1
+
+    @variant.modify
+    def fun(p):
+        return p
+
+@delta_target(sys.modules[__name__], registry)
+def delta2(variant: Delta):
+    variant.remove('a')
+
+@delta_target('core', registry)
+def delta3(variant: Delta):
+    variant.remove('a')
+
+class TestDeltaRegistry:
+    def test_for_target(self):
+        assert registry.for_target('core') == [delta1, delta3]
+        assert registry.for_target(__name__) == registry.for_target(sys.modules[__name__]) == [delta2]
+        assert registry.for_target('other') == []
+        assert registry.targets() == ['core', __name__] and len(registry) == 3
+
+    def test_touching(self):
+        assert registry.touching('core', 'a') == [delta1, delta3]
+        assert registry.touching('core', 'fun') == [delta1]
+        assert registry.touching(__name__, 'fun') == []
+
+        with mock.patch.object(DeltaParser, 'parse_delta', side_effect=AssertionError):
+            assert registry.touching('core', 'a') == [delta1, delta3]
+
+    def test_registration_does_not_parse(self):
+        local = DeltaRegistry()
+        with mock.patch.object(DeltaParser, 'parse_delta', side_effect=AssertionError):
+            @delta_target('core', local)
+            def delta4(variant: Delta):
+                b = 1
+
+        assert local.for_target('core') == [delta4] and not delta4.lazy_delta.is_parsed
+        assert delta4 not in default_registry.for_target('core')
+
+    def test_reregistered_delta_is_replaced(self):
+        local = DeltaRegistry()
+        for value in range(2):
+            @delta_target('core', local)
+            def delta5(variant: Delta):
+                b = 1
+            assert local.touching('core', 'b') == [delta5]
+
+        assert local.for_target('core') == [delta5]
+        local.unregister(delta5, 'core')
+        assert local.for_target('core') == [] and local.touching('core', 'b') == []
+
+    def test_default_registry(self):
+        @delta_target('registry_test_core')
+        def delta6(variant: Delta):
+            b = 1
+
+        try:
+            assert default_registry.for_target('registry_test_core') == [delta6]
+        finally:
+            default_registry.unregister(delta6, 'registry_test_core')
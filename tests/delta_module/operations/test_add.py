@@ -2,7 +2,7 @@ import ast
 import inspect
 import pytest
 
-from pydopast.delta_module import Add, VariableAlreadyExisted
+from pydopast.delta_module import Add, Remove, VariableAlreadyExisted, AmbiguousVariable
 from pydopast.core_module import ModuleAttribute
 from pydopast.core_module.parsers import CoreModuleParser
 
@@ -67,4 +67,34 @@ class TestAddVariable():
         add.apply(cm)
 
         expected_cm = CoreModuleParser().parse(ast.parse(code))
-        assert expected_cm == cm
\ No newline at end of file
+        assert expected_cm == cm
+
+    def test_add_before_definition(self):
+        cm = CoreModuleParser().parse(ast.parse('a = 1\ndef f(): return g()'))
+        Add(['g'], parse('def g(): return a'), before='f').apply(cm)
+
+        assert ast.unparse(cm.to_module()) == 'a = 1\n\ndef g():\n    return a\n\ndef f():\n    return g()'
+        assert cm.attr_to_id['f'] == 1
+        assert cm.body[cm.attr_to_id['g']].name == 'g'
+
+    @pytest.mark.parametrize('code, names', [
+        ('import os', ['os']),
+        ('from os import path, sep', ['path', 'sep']),
+        ('a = b = 1', ['a', 'b']),
+        ('a, b = 1, 2', ['a', 'b']),
+        ('a = 1', ['a']),
+        ('def a(): pass', ['a']),
+    ])
+    def test_occurrences_as_parsed(self, code, names):
+        cm = ModuleAttribute()
+        Add(names, parse(code)).apply(cm)
+
+        expected_cm = CoreModuleParser().parse(ast.parse(code))
+        assert [cm.occurrences(name) for name in names] == [expected_cm.occurrences(name) for name in names]
+
+    def test_added_import_cannot_be_removed(self):
+        cm = ModuleAttribute()
+        Add(['os'], parse('import os')).apply(cm)
+
+        with pytest.raises(AmbiguousVariable):
+            Remove('os').apply(cm)
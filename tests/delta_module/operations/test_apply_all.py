@@ -0,0 +1,66 @@
+import ast
+import pytest
+
+from pydopast.delta_module import (
+    Add, ModifyClass, ModifyFunction, Remove, apply_all,
+    VariableAlreadyExisted, VariableNotFound, InvalidModificationTarget, AmbiguousVariable
+)
+from pydopast.core_module.parsers import CoreModuleParser
+
+from ..util_test import parse, parse_class_header
+
+code = 'a = 1\ndef f(): return 1\nclass C:\n    x = 1'
+
+def core():
+    return CoreModuleParser().parse(ast.parse(code))
+
+class TestApplyAll:
+    def test_same_result_as_applying_in_order(self):
+        operations = [
+            Add(['b'], parse('b = 2')),
+            Remove('a'),
+            Add(['a'], parse('a = 3'), before='f'),
+            ModifyFunction('f', parse('def f(): return original() + a')),
+            Add(['D'], parse('class D:\n    y = 1')),
+            ModifyClass('D', parse_class_header('class D: pass'), [Remove('y'), Add(['z'], parse('z = 2'))]),
+            ModifyClass('C', parse_class_header('class C: pass'), [Add(['y'], parse('y = 2'))]),
+        ]
+        expected = core()
+        for operation in operations:
+            operation.apply(expected)
+
+        cm = core()
+        assert apply_all(cm, operations) is cm
+        assert ast.unparse(cm.to_module()) == ast.unparse(expected.to_module())
+        assert set(cm.attr_to_id) == set(expected.attr_to_id)
+
+    @pytest.mark.parametrize('operations, error', [
+        ([Add(['b'], parse('b = 2')), Add(['b'], parse('b = 3'))], VariableAlreadyExisted),
+        ([Remove('a'), ModifyFunction('a', parse('def a(): pass'))], VariableNotFound),
+        ([Add(['b'], parse('b = 2'), before='h')], VariableNotFound),
+        ([ModifyClass('C', parse_class_header('class C: pass'), [Remove('y')])], VariableNotFound),
+        ([ModifyClass('a', parse_class_header('class a: pass'), [])], InvalidModificationTarget),
+    ])
+    def test_validated_before_applying(self, operations, error, monkeypatch):
+        def fail(self, core_module):
+            raise AssertionError('applied')
+        monkeypatch.setattr(Add, 'apply', fail)
+        monkeypatch.setattr(Remove, 'apply', fail)
+
+        with pytest.raises(error):
+            apply_all(core(), [Add(['g'], parse('g = 1'))] + operations)
+
+    def test_unchanged_when_an_operation_fails(self):
+        cm = core()
+        body, index = cm.body, cm.attr_to_id
+        with pytest.raises(InvalidModificationTarget):
+            apply_all(cm, [Remove('f'), Add(['b'], parse('b = 2')), ModifyFunction('a', parse('def a(): pass'))])
+
+        assert cm.body is body and cm.attr_to_id is index
+        assert ast.unparse(cm.to_module()) == ast.unparse(core().to_module())
+        assert 'b' not in cm.attr_to_id
+
+    def test_redefined_class_is_ambiguous(self):
+        cm = CoreModuleParser().parse(ast.parse('class C:\n    a = 1\nclass C:\n    b = 2'))
+        with pytest.raises(AmbiguousVariable):
+            apply_all(cm, [ModifyClass('C', parse_class_header('class C: pass'), [Remove('b')])])
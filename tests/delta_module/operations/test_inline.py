@@ -0,0 +1,137 @@
+import ast
+import pytest
+
+from pydopast.core_module import CoreModuleParser
+from pydopast.delta_module import ModifyFunction
+from pydopast.delta_module.inline import inline_original
+
+from ..util_test import parse
+
+CORE = 'def handler(req, *, user=None):\n    total = len(req)\n    return total * 2'
+DELTAS = [
+    'def handler(req, *, user=None):\n    return original(req, user=user) + 1',
+    'def handler(req, *, user=None):\n    r = [x for x in req]\n    result = original(r, user=user)\n    return result - 1',
+    'def handler(req, *, user=None):\n    return f"{original(req)}"',
+]
+
+def build(core, deltas, **options):
+    cm = CoreModuleParser().parse(ast.parse(core))
+    for delta in deltas:
+        ModifyFunction('handler', parse(delta), **options).apply(cm)
+    return cm
+
+def run(cm, *args, **kwargs):
+    namespace = dict()
+    exec(compile(cm.to_module(), '<core>', 'exec'), namespace)
+    return namespace['handler'](*args, **kwargs)
+
+class TestInlineOriginal:
+    def test_stacked_deltas(self):
+        cm = build(CORE, DELTAS, inline_original=True)
+
+        assert ast.unparse(cm.to_module()) == (
+            'def handler(req, *, user=None):\n'
+            '    _req_1 = req\n'
+            '    _user_1 = None\n'
+            '    _r_1 = [x for x in _req_1]\n'
+            '    _req_4 = _r_1\n'
+            '    _user_4 = _user_1\n'
+            '    _req_5 = _req_4\n'
+            '    _user_5 = _user_4\n'
+            '    _total_1 = len(_req_5)\n'
+            '    _result_1 = _total_1 * 2 + 1\n'
+            "    return f'{_result_1 - 1}'"
+        )
+        assert run(cm, 'abc') == run(build(CORE, DELTAS), 'abc') == '6'
+
+    def test_operation_and_core_are_not_modified(self):
+        trees = [parse(delta) for delta in DELTAS]
+        dumps = [ast.dump(tree) for tree in trees]
+        core = CoreModuleParser().parse(ast.parse(CORE))
+        previous = ast.dump(core.body[0])
+
+        for _ in range(2):
+            variant = core.fork()
+            for tree in trees:
+                ModifyFunction('handler', tree, inline_original=True).apply(variant)
+
+        assert [ast.dump(tree) for tree in trees] == dumps and ast.dump(core.body[0]) == previous
+
+    @pytest.mark.parametrize('core, delta', [
+        # Early return
+        ('def handler(x):\n    if x:\n        return 1\n    return 2', 'def handler(x):\n    return original(x)'),
+        # Recursion
+        ('def handler(x):\n    return handler(x - 1) if x else 0', 'def handler(x):\n    return original(x)'),
+        # *args and **kwargs
+        ('def handler(*args):\n    return args', 'def handler(*args):\n    return original(1)'),
+        ('def handler(x):\n    return x', 'def handler(*args):\n    return original(*args)'),
+        # Defaults evaluated once
+        ('def handler(x=[]):\n    return x', 'def handler():\n    return original()'),
+        # Captured by a local of the new function
+        ('def handler(x):\n    return x + y', 'def handler(x):\n    y = 2\n    return original(x)'),
+        # Evaluated before the call
+        ('def handler(x):\n    return x', 'def handler(x):\n    return log(x) + original(x)'),
+        ('def handler(x):\n    return x', 'def handler(x):\n    return x and original(x)'),
+        ('def handler(x):\n    return x', 'def handler(x):\n    return counter + original(x)'),
+        ('def handler(x):\n    return x', 'def handler(x):\n    global c\n    c = 1\n    return c + original(x)'),
+        ('def handler(x):\n    return x', 'def handler(x):\n    if x:\n        return original(x)'),
+        # Several uses
+        ('def handler(x):\n    return x', 'def handler(x):\n    return original(x) + original(x)'),
+        # Decorated, generator, frame dependent
+        ('@cache\ndef handler(x):\n    return x', 'def handler(x):\n    return original(x)'),
+        ('def handler(x):\n    yield x', 'def handler(x):\n    return original(x)'),
+        ('def handler(x):\n    return locals()', 'def handler(x):\n    return original(x)'),
+    ])
+    def test_unsafe_cases_are_not_inlined(self, core, delta):
+        previous = ast.parse(core).body[0]
+        assert inline_original(parse(delta), previous) is None
+
+        # Falls back to the nested previous version
+        cm = build(core, [delta], inline_original=True)
+        assert ast.unparse(cm.body[0].body[0]).startswith('def original(')
+
+    def test_keywords_and_defaults(self):
+        core = 'def handler(a, b=2, *, c=3):\n    return (a, b, c)'
+        delta = 'def handler(a):\n    x = original(a, c=a)\n    return x'
+        cm = build(core, [delta], inline_original=True)
+
+        assert 'original' not in ast.unparse(cm.to_module())
+        assert run(cm, 1) == (1, 2, 1)
+
+    def test_global_read_before_the_call(self):
+        core = 'counter = 0\ndef bump():\n    global counter\n    counter += 1\ndef handler(x):\n    bump()\n    return x'
+        delta = 'def handler(x):\n    return counter + original(x)'
+
+        assert run(build(core, [delta], inline_original=True), 0) == run(build(core, [delta]), 0) == 0
+
+    def test_local_read_before_the_call(self):
+        delta = 'def handler(req, *, user=None):\n    n = 1\n    return n + original(req)'
+        cm = build(CORE, [delta], inline_original=True)
+
+        assert 'original' not in ast.unparse(cm.to_module())
+        assert run(cm, 'ab') == 5
+
+    @pytest.mark.parametrize('delta, doc', [
+        ('def handler(x):\n    return original(x)', None),
+        ('def handler(x):\n    """new doc"""\n    return original(x)', 'new doc'),
+    ])
+    def test_docstring_of_previous_version(self, delta, doc):
+        core = 'def handler(x):\n    """old doc"""\n    return x'
+        cm = build(core, [delta], inline_original=True)
+        namespace = dict()
+        exec(compile(cm.to_module(), '<core>', 'exec'), namespace)
+
+        assert 'original' not in ast.unparse(cm.to_module())
+        assert namespace['handler'].__doc__ == doc and namespace['handler'](1) == 1
+
+    @pytest.mark.parametrize('core, delta, args', [
+        # The local passed as argument is rebound after the call
+        ('def handler(a):\n    return lambda: a', 'def handler(x):\n    g = original(x)\n    x = 99\n    return g()', (1,)),
+        ('def handler(a):\n    return [lambda: a][0]', 'def handler(x):\n    g = original(x)\n    x = 99\n    return g()', (1,)),
+        ('def handler(a):\n    return (a for _ in range(1))',
+         'def handler(x):\n    g = original(x)\n    x = 99\n    return next(g)', (1,)),
+        # A later argument rebinds it
+        ('def handler(a, b):\n    return a', 'def handler(x):\n    return original(x, (x := 9))', (1,)),
+    ])
+    def test_arguments_are_evaluated_once(self, core, delta, args):
+        assert run(build(core, [delta], inline_original=True), *args) == run(build(core, [delta]), *args)
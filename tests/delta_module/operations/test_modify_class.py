@@ -0,0 +1,102 @@
+import ast
+import pytest
+
+from pydopast.delta_module import (
+    Add, ModifyClass, ModifyFunction, Remove, InvalidModificationTarget, VariableNotFound, AmbiguousVariable
+)
+from pydopast.core_module.parsers import CoreModuleParser
+
+from ..util_test import parse, parse_class_header, fix_indent_from_str
+
+code = fix_indent_from_str('''
+    @dec1
+    class C(B1, metaclass=M1):
+        a = 1
+        def f(self, x):
+            return x + 1
+        def g(self): pass
+    b = 2
+''')
+
+def run(source: str, name: str = 'C'):
+    namespace = dict(dec1=lambda c: c, dec2=lambda c: c, B1=object, B2=object, M1=type, M2=type)
+    exec(compile(ast.fix_missing_locations(ast.parse(source)), '<test>', 'exec'), namespace)
+    return namespace[name]
+
+class TestModifyClass:
+    def test_member_operations(self):
+        cm = CoreModuleParser().parse(ast.parse(code))
+        ModifyClass('C', parse_class_header('class C(B1, metaclass=M1): pass'), [
+            Add(['c'], parse('c = 3')),
+            Remove('a'),
+            ModifyFunction('g', parse('def g(self): return self.c')),
+        ]).apply(cm)
+
+        assert ast.unparse(cm.body[0]) == fix_indent_from_str('''
+            @dec1
+            class C(B1, metaclass=M1):
+
+                def f(self, x):
+                    return x + 1
+
+                def g(self):
+                    return self.c
+                c = 3''')
+        class_attr = cm.attr_to_id['C'][1]
+        assert 'a' not in class_attr.attr_to_id
+        assert class_attr.body[class_attr.attr_to_id['c']] is cm.body[0].body[-1]
+
+    def test_modify_method_with_original(self):
+        cm = CoreModuleParser().parse(ast.parse(code))
+        ModifyClass('C', parse_class_header('class C: pass'), [
+            ModifyFunction('f', parse('def f(self, x): return original(self, x) * 2'), hoist_original=True),
+        ]).apply(cm)
+        ModifyClass('C', parse_class_header('class C: pass'), [
+            ModifyFunction('f', parse('def f(self, x): return original(self, x) - 1'), inline_original=True),
+        ]).apply(cm)
+
+        assert run(ast.unparse(cm.to_module()))().f(2) == 5
+
+    def test_merge_header(self):
+        cm = CoreModuleParser().parse(ast.parse(code))
+        ModifyClass('C', parse_class_header('@dec1\n@dec2\nclass C(B1, B2, metaclass=M2): pass'), []).apply(cm)
+
+        header = cm.body[0]
+        assert [ast.unparse(dec) for dec in header.decorator_list] == ['dec2', 'dec1']
+        assert [ast.unparse(base) for base in header.bases] == ['B1', 'B2']
+        assert [ast.unparse(keyword) for keyword in header.keywords] == ['metaclass=M2']
+
+    def test_remove_every_member(self):
+        cm = CoreModuleParser().parse(ast.parse('class C:\n    a = 1'))
+        ModifyClass('C', parse_class_header('class C: pass'), [Remove('a')]).apply(cm)
+
+        assert ast.unparse(cm.body[0]) == 'class C:\n    pass'
+
+    def test_forks_are_independent(self):
+        cm = CoreModuleParser().parse(ast.parse(code))
+        class_tree = cm.body[0]
+        forked = cm.fork()
+        ModifyClass('C', parse_class_header('class C: pass'), [Remove('a')]).apply(forked)
+
+        assert cm.body[0] is class_tree and len(class_tree.body) == 3
+        assert 'a' in cm.attr_to_id['C'][1].attr_to_id
+        assert 'a' not in forked.attr_to_id['C'][1].attr_to_id
+
+    def test_failed_member_operation_leaves_class_unchanged(self):
+        cm = CoreModuleParser().parse(ast.parse(code))
+        class_tree = cm.body[0]
+        with pytest.raises(VariableNotFound):
+            ModifyClass('C', parse_class_header('class C: pass'), [Remove('a'), Remove('z')]).apply(cm)
+
+        assert cm.body[0] is class_tree
+        assert 'a' in cm.attr_to_id['C'][1].attr_to_id
+
+    def test_modify_non_class_fail(self):
+        cm = CoreModuleParser().parse(ast.parse(code))
+        with pytest.raises(InvalidModificationTarget):
+            ModifyClass('b', parse_class_header('class b: pass'), []).apply(cm)
+
+    def test_modify_redefined_class_fail(self):
+        cm = CoreModuleParser().parse(ast.parse('class C:\n    a = 1\nclass C:\n    b = 2'))
+        with pytest.raises(AmbiguousVariable):
+            ModifyClass('C', parse_class_header('class C: pass'), [Remove('b')]).apply(cm)
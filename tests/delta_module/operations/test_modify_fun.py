@@ -1,8 +1,9 @@
 import ast
+import asyncio
 import inspect
 import pytest
 
-from pydopast.delta_module import VariableNotFound, ModifyFunction, InvalidModificationTarget
+from pydopast.delta_module import VariableNotFound, ModifyFunction, InvalidModificationTarget, AmbiguousVariable
 from pydopast.core_module import ModuleAttribute
 from pydopast.core_module.parsers import CoreModuleParser
 
@@ -48,6 +49,22 @@ class TestModifyFunction:
             mod.apply(cm)
 
 
+    def test_modify_redefined_function(self):
+        code = 'def fun(): return 1\na = 2\ndef fun(): return 2'
+        cm = CoreModuleParser().parse(ast.parse(code))
+        ModifyFunction('fun', parse('def fun(): return 3')).apply(cm)
+
+        assert ast.unparse(cm.body[0]) == 'def fun():\n    return 1'
+        assert ast.unparse(cm.body[2]) == 'def fun():\n    return 3'
+
+    def test_modify_conditional_function_fail(self):
+        code = 'if a:\n    def fun(): return 1\nelse:\n    def fun(): return 2'
+        cm = CoreModuleParser().parse(ast.parse(code))
+
+        with pytest.raises(AmbiguousVariable):
+            ModifyFunction('fun', parse('def fun(): return 3')).apply(cm)
+
+
     def test_modify_params(self):
         code = 'def fun(): pass'
         cm = CoreModuleParser().parse(ast.parse(code))
@@ -90,8 +107,8 @@ class TestModifyFunction:
         '''
         code = fix_indent_from_str(code)
 
+        # DeltaParser removes the "@delta.modify" decorator before building the operation
         mod_code = '''
-        @delta.modify
         def fun(p1, p2):
             b = p1 + p2
             prev_val = original(b, 2 * b)
@@ -112,7 +129,8 @@ class TestModifyFunction:
                         a = 2
                         a += heavy_fun(p1)
                         return a + p2
-                    
+                    return fun(p1, p2)
+
                 b = p1 + p2
                 prev_val = original(b, 2 * b)
                 return prev_val + p2
@@ -120,4 +138,102 @@ class TestModifyFunction:
         )))
         
         mod.apply(cm)
-        assert expected_cm == cm
\ No newline at end of file
+        assert expected_cm == cm
+
+
+    def test_modify_with_original_shares_trees(self):
+        code = 'def fun(p, *args, k=1, **kwargs):\n    return p + k'
+        tree = parse('def fun(p, *args, k=1, **kwargs):\n    x = [original(p, k=k)]\n    return x[0] * 2')
+        mod = ModifyFunction('fun', tree)
+        dump = ast.dump(tree, include_attributes=True)
+        first = CoreModuleParser().parse(ast.parse(code))
+        second = CoreModuleParser().parse(ast.parse(code))
+        original_tree = first.body[0]
+
+        mod.apply(first)
+        mod.apply(second)
+
+        assert mod.need_original and ast.dump(tree, include_attributes=True) == dump
+        assert first.body[0] is not tree and first.body[0] is not second.body[0]
+        assert first.body[0].body[1:] == tree.body and first.body[0].body[0].body[0] is original_tree
+        assert ast.unparse(first.body[0].body[0].body[1]) == 'return fun(p, *args, k=k, **kwargs)'
+
+        namespace = dict()
+        exec(compile(first.to_module(), '<core>', 'exec'), namespace)
+        assert namespace['fun'](1, k=2) == 6
+
+
+    def test_modify_async_with_original(self):
+        cm = CoreModuleParser().parse(ast.parse('async def f(x):\n    return x * 2'))
+        ModifyFunction('f', parse('async def f(x): return await original(x) + 1')).apply(cm)
+
+        namespace = dict()
+        exec(compile(cm.to_module(), '<core>', 'exec'), namespace)
+        assert asyncio.run(namespace['f'](3)) == 7
+
+
+    def test_original_bound_by_the_function_is_not_wrapped(self):
+        mod = ModifyFunction('fun', parse('def fun():\n    print(original)\n    original = 1'))
+        assert not mod.need_original
+
+class TestHoistOriginal:
+    CORE = 'calls = []\ndef fact(n, *, step=1):\n    calls.append(n)\n    return n * fact(n - step) if n > 1 else 1\n'
+    DELTAS = [
+        'def fact(n, *, step=1):\n    return original(n, step=step) + 1',
+        'def fact(n, *, step=1):\n    return [original(i) for i in range(n)]',
+    ]
+
+    def run(self, hoist_original):
+        cm = CoreModuleParser().parse(ast.parse(self.CORE))
+        mods = [ModifyFunction('fact', parse(delta), hoist_original) for delta in self.DELTAS]
+        for mod in mods:
+            mod.apply(cm)
+
+        namespace = dict()
+        exec(compile(cm.to_module(), '<core>', 'exec'), namespace)
+        return cm, namespace['fact'](4), namespace['calls']
+
+    def test_same_behaviour_as_nested(self):
+        cm, result, calls = self.run(hoist_original=True)
+
+        assert (result, calls) == self.run(hoist_original=False)[1:]
+        body = list(cm.body)
+        assert [node.name for node in body[1:]] == ['_original_fact_1', '_original_fact_2', 'fact']
+        assert ast.unparse(body[1].body[1]) \
+            == 'return n * _original_fact_1(n - step) if n > 1 else 1'
+        assert ast.unparse(body[3]) \
+            == 'def fact(n, *, step=1):\n    return [_original_fact_2(i) for i in range(n)]'
+        assert cm.attr_to_id['_original_fact_2'] == cm.body.handles()[2]
+
+    def test_operation_and_core_are_not_modified(self):
+        tree = parse(self.DELTAS[0])
+        dump = ast.dump(tree)
+        core = CoreModuleParser().parse(ast.parse(self.CORE))
+        previous = core.body[1]
+        mod = ModifyFunction('fact', tree, hoist_original=True)
+        state = dict(vars(mod))
+
+        first = mod.apply(core.fork())
+        second = mod.apply(core.fork())
+
+        assert vars(mod) == state
+
+        assert ast.dump(tree) == dump and core.body[1] is previous and previous.name == 'fact'
+        assert ast.unparse(first.to_module()) == ast.unparse(second.to_module())
+
+    def test_class_default(self, monkeypatch):
+        monkeypatch.setattr(ModifyFunction, 'hoist_original', True)
+        cm = CoreModuleParser().parse(ast.parse('def f(): return 1'))
+        ModifyFunction('f', parse('def f(): return original()')).apply(cm)
+        assert ast.unparse(cm.to_module()) \
+            == 'def _original_f_1():\n    return 1\n\ndef f():\n    return _original_f_1()'
+
+    def test_decorated_previous_version_is_nested(self):
+        core = 'routes = []\ndef route(f):\n    routes.append(f.__name__)\n    return f\n@route\ndef view():\n    return 1'
+        cm = CoreModuleParser().parse(ast.parse(core))
+        ModifyFunction('view', parse('def view(): return original() + 1'), hoist_original=True).apply(cm)
+
+        namespace = dict()
+        exec(compile(cm.to_module(), '<core>', 'exec'), namespace)
+        assert namespace['routes'] == [] and namespace['view']() == 2
+        assert '_original_view_1' not in cm.attr_to_id
@@ -0,0 +1,136 @@
+import ast
+import pytest
+
+from pydopast.core_module import CoreModuleParser
+from pydopast.delta_module import Add, ModifyFunction, Remove, LazyDeltaOperation, optimize
+
+from ..util_test import parse
+
+CORE = 'a = 1\ndef f(x):\n    return x + a\ndef g(x):\n    return x'
+
+def apply(operations):
+    cm = CoreModuleParser().parse(ast.parse(CORE))
+    for operation in operations:
+        operation.apply(cm)
+    return cm
+
+def run(cm, name, *args):
+    namespace = dict()
+    exec(compile(cm.to_module(), '<core>', 'exec'), namespace)
+    return namespace[name](*args)
+
+class TestOptimize:
+    def test_add_then_remove_is_cancelled(self):
+        operations = [
+            Add(['h'], parse('def h(): return 1')),
+            ModifyFunction('h', parse('def h(): return original() + 1')),
+            Remove('a'),
+            Remove('h'),
+        ]
+        optimized, report = optimize(operations)
+
+        assert optimized == [operations[2]]
+        assert [operation for operation, _ in report.eliminated] == [operations[0], operations[1], operations[3]]
+        assert apply(optimized) == apply(operations)
+
+    def test_modify_without_original_discards_previous_ones(self):
+        operations = [
+            ModifyFunction('f', parse('def f(x):\n    return original(x) * 2')),
+            ModifyFunction('g', parse('def g(x):\n    return -x')),
+            ModifyFunction('f', parse('def f(x):\n    return x - 1')),
+        ]
+        optimized, report = optimize(operations)
+
+        assert optimized == operations[1:]
+        assert report.eliminated == [(operations[0], '"f" is replaced without original later')]
+
+    def test_modify_is_merged_into_add(self):
+        operations = [Add(['h'], parse('def h(): return 1')), ModifyFunction('h', parse('def h(): return 2'))]
+        optimized, report = optimize(operations)
+
+        assert optimized == [Add(['h'], parse('def h(): return 2'))]
+        assert report.fused == [(tuple(operations), optimized[0])]
+        assert apply(optimized) == apply(operations)
+
+    def test_original_chain_is_flattened(self):
+        operations = [
+            ModifyFunction('f', parse(f'def f(x):\n    return original(x) + {i}')) for i in range(5)
+        ]
+        optimized, report = optimize(operations)
+
+        assert len(optimized) == 1 and len(report.fused) == 4
+        assert ast.unparse(optimized[0].tree).count('original') == 1
+        assert run(apply(optimized), 'f', 1) == run(apply(operations), 'f', 1) == 12
+
+    def test_same_runtime_result(self):
+        core = 'counter = 0\ndef bump():\n    global counter\n    counter += 1\ndef handler(x):\n    bump()\n    return x'
+        operations = [
+            ModifyFunction('handler', parse('def handler(x):\n    bump()\n    return original(x) * 2')),
+            ModifyFunction('handler', parse('def handler(x):\n    return counter + original(x)')),
+            ModifyFunction('handler', parse('def handler(x):\n    y = original(x)\n    return y + counter')),
+        ]
+        optimized, _ = optimize(operations)
+
+        def result(operations):
+            cm = CoreModuleParser().parse(ast.parse(core))
+            for operation in operations:
+                operation.apply(cm)
+            return run(cm, 'handler', 0)
+
+        assert result(optimized) == result(operations) == 2
+
+    @pytest.mark.parametrize('core, deltas', [
+        ('def f(a):\n    return a', [
+            'def f(a):\n    return lambda: original(a)',
+            'def f(x):\n    g = original(x)\n    x = 99\n    return g()',
+        ]),
+        ('def f(a):\n    return a', [
+            'def f(a):\n    return (original(a) for _ in range(1))',
+            'def f(x):\n    g = original(x)\n    x = 99\n    return next(g)',
+        ]),
+        ('def f(a, b):\n    return a', [
+            'def f(a, b):\n    return original(a, b)',
+            'def f(x):\n    return original(x, (x := 9))',
+        ]),
+    ])
+    def test_same_runtime_result_for_rebound_arguments(self, core, deltas):
+        operations = [ModifyFunction('f', parse(delta)) for delta in deltas]
+        optimized, report = optimize(operations)
+
+        def result(operations):
+            cm = CoreModuleParser().parse(ast.parse(core))
+            for operation in operations:
+                operation.apply(cm)
+            return run(cm, 'f', 1)
+
+        assert report.fused
+        assert result(optimized) == result(operations) == 1
+
+    def test_other_operations_end_sequences(self):
+        operations = [
+            Add(['h'], parse('def h(): return 1')),
+            Add(['i'], parse('i = 1'), before='h'),
+            Remove('h'),
+            ModifyFunction('f', parse('def f(x):\n    return original(x) + 1')),
+            Remove('f'),
+            Add(['f'], parse('def f(x): return x')),
+            ModifyFunction('f', parse('def f(x):\n    return original(x) + 2')),
+        ]
+        optimized, report = optimize(operations)
+
+        assert optimized == operations and not report.eliminated and not report.fused
+
+    def test_deltas_are_expanded(self, tmp_path):
+        path = tmp_path / 'deltas.py'
+        path.write_text(
+            'def delta(variant):\n'
+            '    h = 1\n'
+            '    @variant.modify\n'
+            '    def f(x):\n'
+            '        return original(x) * 2\n'
+            '    variant.remove("h")\n'
+        )
+        optimized, report = optimize([LazyDeltaOperation(str(path), 1)])
+
+        assert len(optimized) == 1 and isinstance(optimized[0], ModifyFunction)
+        assert len(report.eliminated) == 2 and '2 operation(s) eliminated' in str(report)
@@ -1,7 +1,8 @@
+import ast
 import pytest
 
-from pydopast.delta_module import Remove, VariableNotFound
-from pydopast.core_module import ModuleAttribute
+from pydopast.delta_module import Remove, VariableNotFound, AmbiguousVariable
+from pydopast.core_module import ModuleAttribute, CoreModuleParser
 
 from ..util_test import parse
 
@@ -16,7 +17,8 @@ class TestRemove:
         old_id = cm.attr_to_id['a']
         mod.apply(cm)
 
-        assert cm.body[old_id] == None
+        assert old_id not in cm.body
+        assert len(cm.body) == 0
         assert 'a' not in cm.attr_to_id
 
     def test_remove_not_existed_variable(self):
@@ -27,4 +29,20 @@ class TestRemove:
         mod = Remove('b')
 
         with pytest.raises(VariableNotFound):
-            mod.apply(cm)
\ No newline at end of file
+            mod.apply(cm)
+
+    def test_remove_redefined_variable(self):
+        cm = CoreModuleParser().parse(ast.parse('a = 1\nb = 2\ndef a(): pass'))
+
+        Remove('a').apply(cm)
+
+        assert 0 not in cm.body and 2 not in cm.body
+        assert list(cm.body) == [cm.body[1]]
+        assert 'a' not in cm.attr_to_id
+
+    def test_remove_conditional_variable_fail(self):
+        cm = CoreModuleParser().parse(ast.parse('a = 1\nif b:\n    a = 2'))
+
+        with pytest.raises(AmbiguousVariable):
+            Remove('a').apply(cm)
+        assert 0 in cm.body and 'a' in cm.attr_to_id
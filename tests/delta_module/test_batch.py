@@ -0,0 +1,99 @@
+import pickle
+import pytest
+
+from pydopast.delta_module import (Delta, DeltaLibraryError, delta_target, parse_delta, parse_delta_file,
+                                   parse_delta_files, parse_delta_functions)
+
+VALID = '''
+from pydopast.delta_module import delta_target
+
+@delta_target('core')
+def delta1(variant):
+    a = 1
+    variant.remove('b')
+
+@delta_target('core')
+def delta2(variant):
+    @variant.modify
+    def fun(p):
+        return p
+'''
+
+INVALID = '''
+from pydopast.delta_module import delta_target
+
+@delta_target('core')
+def bad(variant):
+    print(1)
+    x = 1
+    variant = 2
+
+@delta_target('core')
+def good(variant):
+    y = 1
+'''
+
+@delta_target('core')
+def delta3(variant: Delta):
+    a = 1
+
+    @variant.modify
+    def fun(p):
+        return original(p)
+
+@delta_target('core')
+def delta4(variant: Delta):
+    for i in range(2):
+        pass
+    import variant
+
+@pytest.fixture
+def delta_files(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f'deltas{i}.py'
+        path.write_text(VALID)
+        paths.append(str(path))
+    return paths
+
+class TestParseDeltaFiles:
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_same_as_serial(self, delta_files, max_workers):
+        parsed = parse_delta_files(delta_files, max_workers=max_workers)
+
+        assert list(parsed) == delta_files
+        assert parsed == {path: parse_delta_file(path) for path in delta_files}
+        assert pickle.loads(pickle.dumps(parsed)) == parsed
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_errors_are_aggregated_per_delta(self, delta_files, tmp_path, max_workers):
+        invalid = tmp_path / 'invalid.py'
+        invalid.write_text(INVALID)
+        broken = tmp_path / 'broken.py'
+        broken.write_text('def (:\n')
+        paths = delta_files + [str(invalid), str(broken)]
+
+        with pytest.raises(DeltaLibraryError) as info:
+            parse_delta_files(paths, max_workers=max_workers)
+
+        errors = info.value.errors
+        assert list(errors) == [(str(invalid), 'bad'), (str(broken), None)]
+        assert [error.lineno for error in errors[(str(invalid), 'bad')]] == [6, 8]
+        assert 'redefine the first parameter' in errors[(str(invalid), 'bad')][1].message
+        assert [d.name for d in info.value.parsed[str(invalid)]] == ['good']
+        assert info.value.parsed[delta_files[0]] == parse_delta_file(delta_files[0])
+
+class TestParseDeltaFunctions:
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_same_as_serial(self, max_workers):
+        parsed = parse_delta_functions([delta3, delta3], max_workers=max_workers)
+        assert parsed == [parse_delta(delta3)] * 2
+
+    def test_errors(self):
+        with pytest.raises(DeltaLibraryError) as info:
+            parse_delta_functions([delta3, delta4], max_workers=1)
+
+        errors = info.value.errors[(__file__, 'delta4')]
+        firstlineno = delta4.__code__.co_firstlineno
+        assert [error.lineno for error in errors] == [firstlineno + 2, firstlineno + 4]
+        assert info.value.parsed[0] == parse_delta(delta3) and info.value.parsed[1] is None
@@ -0,0 +1,60 @@
+import sys
+import pytest
+
+from pydopast.delta_module import DeltaParseError, ManifestEntry, discover_deltas
+
+DELTAS = '''
+import module_that_does_not_exist
+from pydopast.delta_module import delta_target
+
+raise RuntimeError('top-level code must not run')
+
+@delta_target('core')
+def delta1(variant):
+    import os
+    a, b = 1, 2
+    variant.remove('c')
+
+@delta_target(core.sub)
+def delta2(variant):
+    @variant.modify
+    def fun(p):
+        return p
+
+    @variant.modify
+    class A:
+        x = 1
+'''
+
+@pytest.fixture
+def delta_dir(tmp_path):
+    directory = tmp_path / 'deltas'
+    (directory / 'sub').mkdir(parents=True)
+    (directory / 'sub' / 'first.py').write_text(DELTAS)
+    (directory / 'second.py').write_text('x = 1\n')
+    return directory
+
+class TestDiscoverDeltas:
+    def test_manifest(self, delta_dir):
+        manifest = discover_deltas(str(delta_dir))
+        filename = str(delta_dir / 'sub' / 'first.py')
+
+        assert manifest == [
+            ManifestEntry('sub.first', filename, 'delta1', 'core', 8,
+                          frozenset({'os', 'a', 'b'}), frozenset(), frozenset({'c'})),
+            ManifestEntry('sub.first', filename, 'delta2', 'core.sub', 14,
+                          frozenset(), frozenset({'fun', 'A'}), frozenset()),
+        ]
+        assert manifest[0].write_set == {'os', 'a', 'b', 'c'}
+        assert 'sub.first' not in sys.modules and 'module_that_does_not_exist' not in sys.modules
+
+    def test_invalid_delta(self, delta_dir):
+        (delta_dir / 'second.py').write_text(
+            'from pydopast.delta_module import delta_target\n'
+            '@delta_target("core")\n'
+            'def bad(variant):\n'
+            '    print(1)\n'
+        )
+
+        with pytest.raises(DeltaParseError, match='second.py:4'):
+            discover_deltas(str(delta_dir))
@@ -0,0 +1,83 @@
+import pickle
+import pytest
+from unittest import mock
+
+from pydopast.delta_module import (DeltaParser, InvalidDeltaPack, StaleDeltaPack, build_pack, load_pack,
+                                   parse_delta_file)
+
+DELTAS = '''
+from pydopast.delta_module import delta_target
+
+@delta_target('core')
+def delta1(variant):
+    a = 1
+    variant.remove('b')
+
+@delta_target('core')
+def delta2(variant):
+    @variant.modify
+    def fun(p):
+        return p
+'''
+
+@pytest.fixture
+def delta_dir(tmp_path):
+    directory = tmp_path / 'deltas'
+    directory.mkdir()
+    (directory / 'first.py').write_text(DELTAS)
+    (directory / 'second.py').write_text('x = 1\n')
+    return directory
+
+class TestDeltaPack:
+    def test_round_trip(self, delta_dir, tmp_path):
+        pack_path = str(tmp_path / 'deltas.pack')
+        built = build_pack(str(delta_dir), pack_path)
+
+        with mock.patch.object(DeltaParser, 'parse_delta_tree', side_effect=AssertionError):
+            pack = load_pack(pack_path, str(delta_dir))
+
+        assert pack == built
+        assert all(delta._operations is None for delta in pack.deltas())
+        assert list(pack.modules) == ['first', 'second']
+        expected = parse_delta_file(str(delta_dir / 'first.py'))
+        assert [d.operations for d in pack.modules['first']] == [d.operations for d in expected]
+        assert pack.modules['first'][0]._operations is not None and pack.modules['first'][1]._operations is not None
+        assert [d.write_set for d in pack.deltas()] == [frozenset({'a', 'b'}), frozenset({'fun'})]
+        assert pack.deltas()[0].target == 'core'
+
+    def test_changed_source_is_rejected(self, delta_dir, tmp_path):
+        pack_path = str(tmp_path / 'deltas.pack')
+        build_pack(str(delta_dir), pack_path)
+        (delta_dir / 'second.py').write_text('x = 2\n')
+
+        assert load_pack(pack_path).modules['second'] == []
+        with pytest.raises(StaleDeltaPack):
+            load_pack(pack_path, str(delta_dir))
+
+    def test_removed_source_is_rejected(self, delta_dir, tmp_path):
+        pack_path = str(tmp_path / 'deltas.pack')
+        build_pack(str(delta_dir), pack_path)
+        (delta_dir / 'first.py').unlink()
+
+        with pytest.raises(StaleDeltaPack):
+            load_pack(pack_path, str(delta_dir))
+
+    def test_added_source_is_rejected(self, delta_dir, tmp_path):
+        pack_path = str(tmp_path / 'deltas.pack')
+        build_pack(str(delta_dir), pack_path)
+        (delta_dir / 'third.py').write_text('x = 3\n')
+
+        with pytest.raises(StaleDeltaPack, match='third'):
+            load_pack(pack_path, str(delta_dir))
+
+    def test_other_version_is_rejected(self, delta_dir, tmp_path):
+        pack_path = str(tmp_path / 'deltas.pack')
+        build_pack(str(delta_dir), pack_path)
+
+        with mock.patch('pydopast.delta_module.pack.PACK_VERSION', 2), pytest.raises(InvalidDeltaPack):
+            load_pack(pack_path)
+
+        with open(pack_path, 'wb') as f:
+            f.write(pickle.dumps([]))
+        with pytest.raises(InvalidDeltaPack):
+            load_pack(pack_path)
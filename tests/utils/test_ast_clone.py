@@ -0,0 +1,57 @@
+import ast
+import copy
+import inspect
+
+from pydopast.utils import ast_util
+from pydopast.utils.ast_util import clone
+
+CODE = '''
+@decorator(1)
+def fun(a, /, b: int = 2, *args, c, **kwargs) -> dict:
+    global counter
+    x = {1: a, **kwargs}
+    match x:
+        case {1: [y, *_]} if y:
+            return f"{y!r:>10}"
+    return [i async for i in b] if a else None
+'''
+
+def nodes(tree):
+    return [node for node in ast.walk(tree) if node._fields]
+
+class TestClone:
+    def test_clone_equals_deepcopy(self):
+        tree = ast.parse(inspect.getsource(ast_util))
+        tree.body.extend(ast.parse(CODE).body)
+        cloned = clone(tree)
+
+        assert ast.dump(cloned, include_attributes=True) == ast.dump(copy.deepcopy(tree), include_attributes=True)
+        assert all(a is not b for a, b in zip(nodes(cloned), nodes(tree)))
+
+    def test_clone_is_independent(self):
+        tree = ast.parse(CODE).body[0]
+        dump = ast.dump(tree, include_attributes=True)
+        cloned = clone(tree)
+
+        cloned.body.append(ast.Pass())
+        cloned.args.args[0].arg = 'z'
+        cloned.body[0].names.append('other')
+        assert ast.dump(tree, include_attributes=True) == dump
+
+    def test_share_leaves(self):
+        tree = ast.parse('x = y + 1')
+        cloned = clone(tree, share_leaves=True)
+
+        assign = cloned.body[0]
+        assert assign is not tree.body[0] and assign.value is not tree.body[0].value
+        assert assign.value.right is tree.body[0].value.right
+        # Names are renamed in place, they are never shared
+        assert assign.targets[0] is not tree.body[0].targets[0] and assign.value.left is not tree.body[0].value.left
+        assert ast.unparse(cloned) == 'x = y + 1'
+
+    def test_clone_list_and_missing_fields(self):
+        statements = [ast.Return(), ast.Expr(value=ast.Name('x'))]
+        cloned = clone(statements)
+
+        assert cloned is not statements and cloned[1] is not statements[1]
+        assert ast.dump(ast.Module(cloned)) == ast.dump(ast.Module(statements))
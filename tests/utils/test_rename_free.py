@@ -0,0 +1,36 @@
+import ast
+import pytest
+
+from pydopast.utils.ast_util import mentions, rename_free
+from pydopast.core_module import parse_header_only
+
+CASES = [
+    ('def fun(n):\n    return fun(n - 1) if n else 0',
+     'def fun(n):\n    return new(n - 1) if n else 0'),
+    ('def fun(fun):\n    return fun', None),
+    ('def fun():\n    x = fun\n    fun = 1', None),
+    ('def fun():\n    global fun\n    return fun', None),
+    ('def fun():\n    [y for y in [1] if (fun := y)]\n    return fun', None),
+    ('def fun():\n    return [fun for fun in fun]',
+     'def fun():\n    return [fun for fun in new]'),
+    ('def fun():\n    def inner(fun):\n        return fun\n    return [fun for x in fun]',
+     'def fun():\n\n    def inner(fun):\n        return fun\n    return [new for x in new]'),
+    ('def fun():\n    class A:\n        fun = fun\n        def m(self):\n            return fun\n    return A',
+     'def fun():\n\n    class A:\n        fun = fun\n\n        def m(self):\n            return new\n    return A'),
+    ('def fun():\n    @fun\n    def g(x=fun):\n        fun = 2\n        return fun\n    return lambda: fun',
+     'def fun():\n\n    @new\n    def g(x=new):\n        fun = 2\n        return fun\n    return lambda: new'),
+]
+
+class TestRenameFree:
+    @pytest.mark.parametrize('code, expected', CASES)
+    def test_rename_free(self, code, expected):
+        function = ast.parse(code).body[0]
+        assert rename_free(function, 'fun', 'new') == (expected is not None)
+        assert ast.unparse(function) == (expected or code)
+
+    def test_mentions_does_not_parse_deferred_bodies(self):
+        module_attrs = parse_header_only('def f():\n    return g()\n')
+        body = module_attrs.body[0].body
+
+        assert mentions(body, 'g') and not mentions(body, 'h')
+        assert not body.is_materialized
@@ -0,0 +1,60 @@
+import ast
+import os
+import pytest
+from unittest import mock
+
+from pydopast.utils.source_util import SourceIndex, dedent, get_source
+
+class TestGetSource:
+    def test_nested_function_is_dedented(self):
+        def decorator(f):
+            return f
+
+        @decorator
+        def fun(a):
+            s = """
+text"""
+            return a
+
+        src = get_source(fun)
+        assert src.startswith('@decorator\ndef fun(a):\n    s = ')
+        assert ast.parse(src).body[0].name == 'fun'
+
+    def test_tab_indentation(self, tmp_path):
+        path = tmp_path / 'tabs.py'
+        path.write_text('class A:\n\tdef f(self,\n    x):\n\t\ts = """\n  text"""\n\n\t\treturn x\n')
+        namespace = dict()
+        exec(compile(path.read_text(), str(path), 'exec'), namespace)
+
+        src = SourceIndex().source(namespace['A'].f)
+        assert src == 'def f(self,\n    x):\n\ts = """\n  text"""\n\n\treturn x\n'
+        assert ast.parse(src).body[0].name == 'f'
+        assert dedent('\t\tx = 1\n\t\ty = (\n\t2)\n') == 'x = 1\ny = (\n\t2)\n'
+
+class TestSourceIndex:
+    def test_file_is_indexed_once(self, tmp_path):
+        path = tmp_path / 'deltas.py'
+        path.write_text('@decorator(\n    1)\ndef f():\n    pass\n\ndef g():\n    return 1\n')
+        index = SourceIndex()
+
+        assert index.source_at(str(path), 1) == '@decorator(\n    1)\ndef f():\n    pass\n'
+        with mock.patch('pydopast.utils.source_util.tokenize.open', side_effect=AssertionError), \
+                mock.patch('pydopast.utils.source_util.inspect.getblock', side_effect=AssertionError):
+            assert index.source_at(str(path), 6) == 'def g():\n    return 1\n'
+
+    def test_changed_file_is_indexed_again(self, tmp_path):
+        path = tmp_path / 'deltas.py'
+        path.write_text('def f():\n    pass\n')
+        index = SourceIndex()
+        assert index.source_at(str(path), 1) == 'def f():\n    pass\n'
+
+        path.write_text('def f():\n    return 1\n')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert index.source_at(str(path), 1) == 'def f():\n    return 1\n'
+
+    def test_missing_line(self, tmp_path):
+        path = tmp_path / 'deltas.py'
+        path.write_text('x = 1\n')
+        with pytest.raises(OSError):
+            SourceIndex().source_at(str(path), 3)